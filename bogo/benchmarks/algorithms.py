@@ -0,0 +1,103 @@
+"""
+Head-to-head benchmark of the sorting algorithms in bogoapp.algorithms.
+
+Sorts the same reversed sequences with every algorithm, using the same random
+seed per run, and reports steps per second and the measured steps compared to
+the expected number of steps from the reversed sequence.
+Run from the bogo directory:
+
+    python3 benchmarks/algorithms.py --lengths 3-8 --runs 5 --output benchmarks/results/algorithms.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bogoapp import algorithms
+from bogoapp import tools
+
+
+def sort_once(name, length, seed, max_steps):
+    """
+    Sort a reversed sequence of length elements and return the number of steps,
+    the expected number of steps, the elapsed seconds and whether the sequence
+    was sorted within max_steps.
+    >>> steps, expected_steps, seconds, sorted_ = sort_once("permutations", 4, 1, 100)
+    >>> steps, expected_steps, sorted_
+    (23, 23, True)
+    """
+    algorithm = algorithms.make_algorithm(name, random.Random(seed))
+    sequence = list(range(length, 0, -1))
+    algorithm.reset(sequence)
+    expected_steps = algorithm.expected_steps(sequence)
+    steps = 0
+    start = time.perf_counter()
+    while steps < max_steps and not tools.is_sorted(sequence):
+        algorithm.step(sequence)
+        steps += 1
+    return steps, expected_steps, time.perf_counter() - start, tools.is_sorted(sequence)
+
+
+def compare(names, lengths, runs, seed, max_steps):
+    results = {}
+    for name in names:
+        results[name] = {}
+        for length in lengths:
+            steps, expected_steps, seconds, finished = zip(
+                    *(sort_once(name, length, seed + run, max_steps) for run in range(runs)))
+            results[name][length] = {
+                "runs": runs,
+                "unfinished": finished.count(False),
+                "mean_steps": statistics.mean(steps),
+                "expected_steps": statistics.mean(expected_steps),
+                "expected_steps_is_estimate": algorithms.ALGORITHMS[name].expected_steps_is_estimate,
+                "steps_per_second": sum(steps) / sum(seconds) if sum(seconds) else None,
+                "mean_seconds": statistics.mean(seconds),
+            }
+    return results
+
+
+def parse_lengths(value):
+    """
+    >>> parse_lengths("3-5")
+    [3, 4, 5]
+    >>> parse_lengths("7")
+    [7]
+    """
+    first, _, last = value.partition("-")
+    return list(range(int(first), int(last or first) + 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--algorithms", nargs="+", default=sorted(algorithms.ALGORITHMS),
+                        choices=sorted(algorithms.ALGORITHMS))
+    parser.add_argument("--lengths", type=parse_lengths, default=parse_lengths("3-8"),
+                        help="Sequence length or range of lengths, e.g. 3-8")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-steps", type=int, default=10**7,
+                        help="Give up sorting a sequence after this many steps")
+    parser.add_argument("--output", help="Write the results as JSON into this file")
+    args = parser.parse_args()
+
+    results = {"python": platform.python_version(),
+               "arguments": {key: value for key, value in vars(args).items() if key != "output"},
+               "algorithms": compare(args.algorithms, args.lengths, args.runs,
+                                     args.seed, args.max_steps)}
+    serialized = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(serialized)
+    print(serialized)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Load test for the /feed WebSocket and the /bogo/<id>.json endpoints.
+
+Opens many /feed connections speaking the same ping-pong protocol as
+static/js/main.js, i.e. wait for a state message, wait for the client interval
+and answer "OK", while concurrent readers fetch bogo JSON data.
+Measures message rates, latency percentiles, server CPU usage and the
+shuffle throughput of the sorter, first without load and then under load.
+Run from the bogo directory against a server started with a throwaway SQLite database:
+
+    python3 benchmarks/loadtest.py --serve --connections 2000 --output benchmarks/results/loadtest.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+import websockets
+
+
+BOGO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def percentiles(values):
+    """
+    >>> percentiles([4, 1, 3, 2])
+    {'count': 4, 'p50': 3, 'p90': 4, 'p99': 4, 'max': 4}
+    >>> percentiles([])
+    {'count': 0}
+    """
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    def rank(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"count": len(ordered),
+            "p50": rank(0.5),
+            "p90": rank(0.9),
+            "p99": rank(0.99),
+            "max": ordered[-1]}
+
+
+def positive_deltas(counts):
+    """
+    Sum of increments in a sequence of shuffle counts, which restart from zero for each new bogo.
+    >>> positive_deltas([1, 5, 9, 2, 4])
+    12
+    """
+    total = 0
+    for previous, current in zip(counts, counts[1:]):
+        total += current - previous if current >= previous else current
+    return total
+
+
+def process_tree(pid):
+    """Return pid and the pids of all its descendants, e.g. Sanic workers."""
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    parents[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError):
+                continue
+    tree = [pid]
+    for p in tree:
+        tree.extend(child for child, parent in parents.items() if parent == p)
+    return tree
+
+
+def cpu_seconds(pids):
+    """Return the user and system CPU seconds used by the given processes."""
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        utime, stime = int(fields[11]), int(fields[12])
+        total += utime + stime
+    return total / CLOCK_TICKS
+
+
+class Stats:
+
+    def __init__(self):
+        self.ws_latencies = []
+        self.ws_messages = 0
+        self.ws_errors = 0
+        self.json_latencies = []
+        self.json_statuses = {}
+        self.json_errors = 0
+
+
+async def feed_client(ws_url, interval, stats, stop_at, shuffle_counts=None):
+    """
+    Speak the main.js protocol until stop_at and record the round trip latency
+    from sending "OK" until the next state message.
+    """
+    try:
+        async with websockets.connect(ws_url) as ws:
+            message = await ws.recv()
+            while True:
+                stats.ws_messages += 1
+                if shuffle_counts is not None:
+                    shuffle_counts.append(json.loads(message)[1])
+                await asyncio.sleep(interval)
+                if time.perf_counter() >= stop_at:
+                    break
+                sent = time.perf_counter()
+                await ws.send("OK")
+                message = await ws.recv()
+                stats.ws_latencies.append(time.perf_counter() - sent)
+    except (OSError, websockets.exceptions.WebSocketException):
+        stats.ws_errors += 1
+
+
+async def http_get(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def json_reader(base_url, bogo_ids, stats, stop_at):
+    url = urllib.parse.urlsplit(base_url)
+    while time.perf_counter() < stop_at:
+        path = "/bogo/{}.json".format(random.choice(bogo_ids))
+        start = time.perf_counter()
+        try:
+            status = await http_get(url.hostname, url.port or 80, path)
+        except (OSError, ValueError, IndexError):
+            stats.json_errors += 1
+            continue
+        stats.json_latencies.append(time.perf_counter() - start)
+        stats.json_statuses[status] = stats.json_statuses.get(status, 0) + 1
+
+
+async def measure_shuffle_throughput(ws_url, interval, duration):
+    """Return shuffles per second seen by a single probing spectator."""
+    shuffle_counts = []
+    stats = Stats()
+    start = time.perf_counter()
+    await feed_client(ws_url, interval, stats, start + duration, shuffle_counts)
+    return positive_deltas(shuffle_counts) / (time.perf_counter() - start)
+
+
+async def run_load(args, server_pids):
+    ws_url = urllib.parse.urljoin(args.url.replace("http", "ws", 1), "/feed")
+    baseline = await measure_shuffle_throughput(ws_url, args.interval, args.baseline)
+
+    stats = Stats()
+    stop_at = time.perf_counter() + args.ramp_up + args.duration
+    clients = []
+    for i in range(args.connections):
+        clients.append(asyncio.ensure_future(feed_client(ws_url, args.interval, stats, stop_at)))
+        # Spread connection attempts over the ramp up period
+        await asyncio.sleep(args.ramp_up / args.connections)
+    clients.extend(asyncio.ensure_future(json_reader(args.url, args.bogo_ids, stats, stop_at))
+                   for _ in range(args.json_readers))
+
+    messages_start = stats.ws_messages
+    json_start = len(stats.json_latencies)
+    cpu_start = cpu_seconds(server_pids)
+    start = time.perf_counter()
+    under_load = await measure_shuffle_throughput(ws_url, args.interval, args.duration)
+    await asyncio.gather(*clients)
+    elapsed = time.perf_counter() - start
+    cpu = cpu_seconds(server_pids) - cpu_start
+
+    return {
+        "shuffles_per_second": {"baseline": baseline,
+                                "under_load": under_load,
+                                "ratio": under_load / baseline if baseline else None},
+        "feed": {"connections": args.connections,
+                 "errors": stats.ws_errors,
+                 "messages_per_second": (stats.ws_messages - messages_start) / elapsed,
+                 "latency_seconds": percentiles(stats.ws_latencies)},
+        "json": {"readers": args.json_readers,
+                 "errors": stats.json_errors,
+                 "statuses": stats.json_statuses,
+                 "requests_per_second": (len(stats.json_latencies) - json_start) / elapsed,
+                 "latency_seconds": percentiles(stats.json_latencies)},
+        "server": {"pids": server_pids,
+                   "cpu_seconds": cpu,
+                   "cpu_utilization": cpu / elapsed if server_pids else None},
+    }
+
+
+def wait_for_health(url, timeout):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(urllib.parse.urljoin(url, "/health"), timeout=1) as response:
+                if json.load(response)["status"] == "ready":
+                    return
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"Server at {url} did not become ready in {timeout} seconds")
+
+
+def start_server(database_path):
+    env = dict(os.environ, BOGO_DATABASE_PATH=database_path)
+    return subprocess.Popen([sys.executable, "main.py"],
+                            cwd=BOGO_PATH,
+                            env=env,
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+
+
+def raise_open_file_limit(connections):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = connections + 1024
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+
+def parse_bogo_ids(value):
+    """
+    >>> parse_bogo_ids("1-3")
+    [1, 2, 3]
+    >>> parse_bogo_ids("7")
+    [7]
+    """
+    first, _, last = value.partition("-")
+    return list(range(int(first), int(last or first) + 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--serve", action="store_true",
+                        help="Start the server with a temporary SQLite database")
+    parser.add_argument("--server-pid", type=int,
+                        help="Measure the CPU usage of this already running server")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--json-readers", type=int, default=10)
+    parser.add_argument("--bogo-ids", type=parse_bogo_ids, default=[1],
+                        help="Bogo id or range of ids to read, e.g. 1-10")
+    parser.add_argument("--interval", type=float, default=0.1,
+                        help="Seconds a client waits before answering, like main.js")
+    parser.add_argument("--baseline", type=float, default=5.0,
+                        help="Seconds to measure shuffle throughput without load")
+    parser.add_argument("--ramp-up", type=float, default=5.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the results as JSON into this file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    raise_open_file_limit(args.connections + args.json_readers)
+    server = None
+    database_dir = None
+    try:
+        if args.serve:
+            database_dir = tempfile.TemporaryDirectory()
+            server = start_server(os.path.join(database_dir.name, "bogo.db"))
+            server_pids = None
+        else:
+            server_pids = process_tree(args.server_pid) if args.server_pid else []
+        wait_for_health(args.url, args.timeout)
+        if server is not None:
+            server_pids = process_tree(server.pid)
+        results = asyncio.get_event_loop().run_until_complete(run_load(args, server_pids))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if database_dir is not None:
+            database_dir.cleanup()
+
+    results = {"python": platform.python_version(),
+               "arguments": {key: value for key, value in vars(args).items() if key != "output"},
+               **results}
+    serialized = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(serialized)
+    print(serialized)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Startup time benchmark.
+
+Measures the wall clock time of importing main.py in a fresh interpreter,
+breaks the import time down per module with -X importtime and optionally
+measures the time until a server, started with a throwaway SQLite database,
+answers /health.
+Run from the bogo directory:
+
+    python3 benchmarks/startup.py --output benchmarks/results/startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+
+BOGO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(module, repeat):
+    """Return wall clock seconds of importing module in fresh interpreters."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import " + module],
+                       cwd=BOGO_PATH,
+                       check=True,
+                       stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def parse_importtime(output):
+    """
+    Parse -X importtime output into (module, self microseconds, cumulative microseconds) tuples.
+    >>> parse_importtime("import time: self [us] | cumulative | imported package\\n"
+    ...                  "import time:       306 |     107860 |   sanic")
+    [('sanic', 306, 107860)]
+    """
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def importtime_breakdown(module, top):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                            cwd=BOGO_PATH,
+                            check=True,
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE,
+                            universal_newlines=True)
+    rows = parse_importtime(result.stderr)
+    by_cumulative = sorted(rows, key=lambda row: row[2], reverse=True)
+    return [{"module": name, "self_us": self_us, "cumulative_us": cumulative_us}
+            for name, self_us, cumulative_us in by_cumulative[:top]]
+
+
+def time_to_health(url, timeout):
+    """
+    Start the server with a throwaway SQLite database and return seconds until
+    url responds, or None on timeout.
+    """
+    database_dir = tempfile.TemporaryDirectory()
+    env = dict(os.environ, BOGO_DATABASE_PATH=os.path.join(database_dir.name, "bogo.db"))
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "main.py"],
+                              cwd=BOGO_PATH,
+                              env=env,
+                              stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        return None
+    finally:
+        server.terminate()
+        server.wait()
+        database_dir.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--top", type=int, default=25,
+                        help="Number of modules to include in the import time breakdown")
+    parser.add_argument("--serve", action="store_true",
+                        help="Also measure the time until the server answers health checks")
+    parser.add_argument("--health-url", default="http://127.0.0.1:8000/health")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="Write the results as JSON into this file")
+    args = parser.parse_args()
+
+    times = import_times(args.module, args.repeat)
+    results = {
+        "python": platform.python_version(),
+        "module": args.module,
+        "import_seconds": {"min": min(times),
+                           "median": statistics.median(times),
+                           "max": max(times)},
+        "importtime": importtime_breakdown(args.module, args.top),
+    }
+    if args.serve:
+        results["time_to_health_seconds"] = time_to_health(args.health_url, args.timeout)
+
+    serialized = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(serialized)
+    print(serialized)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""
+Sorting algorithms run by the BogoManager.
+
+Each algorithm modifies a sequence in place one step at a time until the
+sequence happens to be sorted.
+New algorithms are registered by subclassing SortAlgorithm and adding them into ALGORITHMS.
+"""
+import collections
+import functools
+import math
+
+from bogoapp import tools
+
+
+class SortAlgorithm:
+    """
+    Interface of sorting algorithms.
+    An instance is bound to a random module and sorts one sequence at a time.
+    """
+    name = None
+    # True if the progress of the algorithm is saved with checkpoint() and
+    # restored by passing it to reset()
+    checkpointed = False
+
+    def __init__(self, random_module):
+        self.random = random_module
+
+    def reset(self, sequence, checkpoint=None):
+        """Called before sorting a new sequence or resuming an unfinished one."""
+        pass
+
+    def checkpoint(self):
+        return None
+
+    def exhausted(self):
+        """True if the algorithm gave up, even though the sequence might not be sorted."""
+        return False
+
+    def step(self, sequence):
+        """Modify the sequence in place, which counts as one shuffle."""
+        raise NotImplementedError
+
+    # True if expected_steps is only an order of magnitude estimate
+    expected_steps_is_estimate = False
+
+    def expected_steps(self, sequence):
+        """
+        Expected number of steps to sort the sequence of distinct elements,
+        called after reset(sequence).
+        """
+        raise NotImplementedError
+
+
+class Bogosort(SortAlgorithm):
+    """
+    Shuffle the whole sequence.
+    Each shuffle is sorted with probability 1/n!, so sorting an unsorted
+    sequence takes n! shuffles on average.
+    >>> Bogosort(None).expected_steps([4, 3, 2, 1])
+    24
+    """
+    name = "bogosort"
+
+    def step(self, sequence):
+        self.random.shuffle(sequence)
+
+    def expected_steps(self, sequence):
+        if tools.is_sorted(sequence):
+            return 0
+        return math.factorial(len(sequence))
+
+
+class Bozosort(SortAlgorithm):
+    """
+    Swap two randomly chosen elements.
+    The expected number of swaps depends on the starting sequence and grows
+    roughly as n!, which is used as an order of magnitude estimate.
+    >>> Bozosort(None).expected_steps([4, 3, 2, 1])
+    24
+    """
+    name = "bozosort"
+    expected_steps_is_estimate = True
+
+    def step(self, sequence):
+        n = len(sequence)
+        i, j = self.random.randrange(n), self.random.randrange(n)
+        sequence[i], sequence[j] = sequence[j], sequence[i]
+
+    def expected_steps(self, sequence):
+        if tools.is_sorted(sequence):
+            return 0
+        return math.factorial(len(sequence))
+
+
+class PermutationEnumeration(SortAlgorithm):
+    """
+    Step to the previous permutation in lexicographic order,
+    wrapping around from the first permutation to the last.
+    Starting from a reversed sequence, all n! permutations are visited.
+    >>> sequence = [3, 2, 1]
+    >>> algorithm = PermutationEnumeration(None)
+    >>> for _ in range(5):
+    ...     algorithm.step(sequence)
+    ...     sequence
+    [3, 1, 2]
+    [2, 3, 1]
+    [2, 1, 3]
+    [1, 3, 2]
+    [1, 2, 3]
+
+    The number of steps is the lexicographic index of the starting sequence:
+    >>> PermutationEnumeration(None).expected_steps([4, 3, 2, 1])
+    23
+    """
+    name = "permutations"
+
+    def step(self, sequence):
+        n = len(sequence)
+        i = n - 2
+        while i >= 0 and sequence[i] <= sequence[i+1]:
+            i -= 1
+        if i >= 0:
+            j = n - 1
+            while sequence[j] >= sequence[i]:
+                j -= 1
+            sequence[i], sequence[j] = sequence[j], sequence[i]
+        sequence[i+1:] = reversed(sequence[i+1:])
+
+    def expected_steps(self, sequence):
+        return permutation_index(sequence)
+
+
+@functools.lru_cache(maxsize=None)
+def _heap_cycle(length):
+    """
+    Return the permutation p, such that enumerating all permutations of the
+    first length elements of a list a with Heap's algorithm leaves a[j] == old_a[p[j]].
+    >>> _heap_cycle(3)
+    (2, 1, 0)
+    """
+    positions = list(range(length))
+    if length < 2:
+        return tuple(positions)
+    inner = _heap_cycle(length - 1)
+    for i in range(length):
+        positions[:length-1] = [positions[p] for p in inner]
+        if i < length - 1:
+            j = i if length % 2 == 0 else 0
+            positions[j], positions[length-1] = positions[length-1], positions[j]
+    return tuple(positions)
+
+
+def heap_permutation_index(goal):
+    """
+    Return the number of swaps Heap's algorithm makes, starting from the
+    identity arrangement of positions, until the positions are arranged as goal.
+    >>> [heap_permutation_index(goal) for goal in ([0, 1, 2], [1, 0, 2], [2, 1, 0])]
+    [0, 1, 5]
+    """
+    arrangement = list(range(len(goal)))
+    index = 0
+    for length in range(len(goal), 1, -1):
+        # Heap's algorithm enumerates the permutations of the first length - 1
+        # elements once for each element at the last position of the prefix.
+        block = math.factorial(length - 1)
+        for i in range(length):
+            if arrangement[length-1] == goal[length-1]:
+                index += i * block
+                break
+            inner = _heap_cycle(length - 1)
+            arrangement[:length-1] = [arrangement[p] for p in inner]
+            j = i if length % 2 == 0 else 0
+            arrangement[j], arrangement[length-1] = arrangement[length-1], arrangement[j]
+        else:
+            raise ValueError("{} is not a permutation of positions.".format(goal))
+    return index
+
+
+class DeterministicBogosort(SortAlgorithm):
+    """
+    Enumerate permutations with Heap's algorithm, which swaps exactly one pair
+    of elements per step and visits all n! permutations of the starting sequence.
+    The enumeration is restarted from the current sequence when resuming.
+    >>> sequence = [3, 2, 1]
+    >>> algorithm = DeterministicBogosort(None)
+    >>> algorithm.reset(sequence)
+    >>> for _ in range(5):
+    ...     algorithm.step(sequence)
+    ...     sequence
+    [2, 3, 1]
+    [1, 3, 2]
+    [3, 1, 2]
+    [2, 1, 3]
+    [1, 2, 3]
+
+    The number of steps is the index of the sorted permutation in the order
+    of Heap's algorithm, starting from the sequence:
+    >>> algorithm.reset([3, 2, 1])
+    >>> algorithm.expected_steps([3, 2, 1])
+    5
+    """
+    name = "deterministic"
+
+    def __init__(self, random_module):
+        super().__init__(random_module)
+        self.reset([])
+
+    def reset(self, sequence, checkpoint=None):
+        self.counters = [0] * len(sequence)
+        self.i = 1
+
+    def step(self, sequence):
+        n = len(sequence)
+        if n < 2:
+            return
+        if len(self.counters) != n:
+            self.reset(sequence)
+        while self.i < n and self.counters[self.i] >= self.i:
+            self.counters[self.i] = 0
+            self.i += 1
+        if self.i >= n:
+            # All permutations visited, start over
+            self.reset(sequence)
+            return self.step(sequence)
+        if self.i % 2 == 0:
+            sequence[0], sequence[self.i] = sequence[self.i], sequence[0]
+        else:
+            k = self.counters[self.i]
+            sequence[k], sequence[self.i] = sequence[self.i], sequence[k]
+        self.counters[self.i] += 1
+        self.i = 1
+
+    def expected_steps(self, sequence):
+        if any(self.counters):
+            raise ValueError("Expected steps are known only for a reset enumeration.")
+        goal = sorted(range(len(sequence)), key=sequence.__getitem__)
+        return heap_permutation_index(goal)
+
+
+def permutation_index(permutation):
+    """
+    Return the index of a permutation of distinct elements in the lexicographic
+    order of all permutations of the same elements, computed from its Lehmer code.
+    >>> permutation_index([0, 1, 2])
+    0
+    >>> permutation_index([1, 2, 0])
+    3
+    >>> permutation_index([2, 1, 0])
+    5
+    """
+    n = len(permutation)
+    index = 0
+    for i, x in enumerate(permutation):
+        smaller_after = sum(1 for y in permutation[i+1:] if y < x)
+        index += smaller_after * math.factorial(n - 1 - i)
+    return index
+
+
+def permutation_from_index(length, index):
+    """
+    Return the permutation of range(length) with the given lexicographic index.
+    >>> permutation_from_index(3, 3)
+    [1, 2, 0]
+    >>> all(permutation_index(permutation_from_index(4, i)) == i for i in range(24))
+    True
+    """
+    remaining = list(range(length))
+    permutation = []
+    for i in range(length - 1, -1, -1):
+        digit, index = divmod(index, math.factorial(i))
+        permutation.append(remaining.pop(digit))
+    return permutation
+
+
+def enumeration_range(length, part, parts):
+    """
+    Return the start and stop permutation indexes of part of all permutations
+    of length elements, split into parts of nearly equal size.
+    >>> [enumeration_range(4, part, 3) for part in range(3)]
+    [(0, 8), (8, 16), (16, 24)]
+    """
+    total = math.factorial(length)
+    return total * part // parts, total * (part + 1) // parts
+
+
+class Checkpoint(collections.namedtuple("Checkpoint", "base start position stop")):
+    """
+    Progress of enumerating the permutations of the starting sequence base,
+    from index start to position, stopping before index stop.
+    """
+    __slots__ = ()
+
+    @property
+    def steps(self):
+        return self.position - self.start
+
+
+class LehmerEnumeration(SortAlgorithm):
+    """
+    Enumerate the permutations of the starting sequence in order of their
+    Lehmer code index, so the progress is a single integer index.
+    Index 0 is the starting sequence, a reversed sequence is sorted at the last index.
+    Only the indexes of the given part of all permutations are visited,
+    so the enumeration can be split across processes.
+    >>> sequence = [3, 2, 1]
+    >>> algorithm = LehmerEnumeration(None)
+    >>> algorithm.reset(sequence)
+    >>> algorithm.sorted_index
+    5
+    >>> for _ in range(5):
+    ...     algorithm.step(sequence)
+    >>> sequence, algorithm.checkpoint().position, algorithm.exhausted()
+    ([1, 2, 3], 5, True)
+
+    Resuming from a checkpoint continues from the saved index.
+    The sequence is rebuilt from the starting sequence saved in the checkpoint,
+    so a sequence saved before or after the checkpoint does not matter:
+    >>> sequence = [3, 2, 1]
+    >>> algorithm.reset(sequence)
+    >>> algorithm.step(sequence)
+    >>> sequence, algorithm.checkpoint()
+    ([3, 1, 2], Checkpoint(base=[3, 2, 1], start=0, position=1, stop=6))
+    >>> resumed = LehmerEnumeration(None)
+    >>> stale_sequence = [1, 2, 3]
+    >>> resumed.reset(stale_sequence, algorithm.checkpoint())
+    >>> stale_sequence
+    [3, 1, 2]
+    >>> resumed.step(stale_sequence)
+    >>> stale_sequence, resumed.checkpoint().position
+    ([2, 3, 1], 2)
+    """
+    name = "lehmer"
+    checkpointed = True
+
+    def __init__(self, random_module, part=0, parts=1):
+        super().__init__(random_module)
+        if not 0 <= part < parts:
+            raise ValueError("Invalid enumeration part {} of {} parts.".format(part, parts))
+        self.part = part
+        self.parts = parts
+        self.reset([])
+
+    def reset(self, sequence, checkpoint=None):
+        n = len(sequence)
+        if checkpoint is None:
+            self.base = list(sequence)
+            self.start, self.stop = enumeration_range(n, self.part, self.parts)
+            self.position = self.start
+        else:
+            if sorted(checkpoint.base) != sorted(sequence):
+                raise ValueError("Checkpoint of enumerating {} does not match the sequence {}."
+                                 .format(checkpoint.base, sequence))
+            self.base = list(checkpoint.base)
+            self.start, self.position, self.stop = checkpoint.start, checkpoint.position, checkpoint.stop
+        # The sequence is the base permuted by the permutation at position
+        self.positions = permutation_from_index(n, self.position)
+        sequence[:] = [self.base[i] for i in self.positions]
+        self.sorted_index = permutation_index(sorted(range(n), key=self.base.__getitem__))
+
+    def step(self, sequence):
+        if self.exhausted():
+            return
+        # Next lexicographic permutation of the positions, applied also to the sequence
+        positions = self.positions
+        i = len(positions) - 2
+        while positions[i] > positions[i+1]:
+            i -= 1
+        j = len(positions) - 1
+        while positions[j] < positions[i]:
+            j -= 1
+        positions[i], positions[j] = positions[j], positions[i]
+        sequence[i], sequence[j] = sequence[j], sequence[i]
+        positions[i+1:] = reversed(positions[i+1:])
+        sequence[i+1:] = reversed(sequence[i+1:])
+        self.position += 1
+
+    def checkpoint(self):
+        return Checkpoint(list(self.base), self.start, self.position, self.stop)
+
+    def exhausted(self):
+        return self.position >= self.stop - 1
+
+    def as_dict(self):
+        return {"start": self.start,
+                "position": self.position,
+                "stop": self.stop,
+                "sorted_index": self.sorted_index,
+                "part": self.part,
+                "parts": self.parts}
+
+    def expected_steps(self, sequence):
+        """
+        Steps until the sorted permutation, if it is in the rest of this part,
+        else until the end of this part.
+        >>> algorithm = LehmerEnumeration(None, part=1, parts=2)
+        >>> sequence = [1, 2, 3, 4]
+        >>> algorithm.reset(sequence)
+        >>> algorithm.checkpoint()[1:], algorithm.expected_steps(sequence)
+        ((12, 12, 24), 11)
+        """
+        if self.position <= self.sorted_index < self.stop:
+            return self.sorted_index - self.position
+        return max(0, self.stop - 1 - self.position)
+
+
+ALGORITHMS = {algorithm.name: algorithm
+              for algorithm in (Bogosort,
+                                Bozosort,
+                                PermutationEnumeration,
+                                DeterministicBogosort,
+                                LehmerEnumeration)}
+
+
+def make_algorithm(name, random_module, **options):
+    """Return an instance of the algorithm registered with name, passing options to it."""
+    if name not in ALGORITHMS:
+        raise ValueError("Unknown sorting algorithm {}, expected one of {}."
+                         .format(repr(name), ", ".join(sorted(ALGORITHMS))))
+    return ALGORITHMS[name](random_module, **options)
@@ -0,0 +1,293 @@
+"""
+Build step for static assets and lookup of the built files.
+
+The build copies each static asset into a content-hashed filename and writes
+precompressed gzip (and brotli, if the brotli module is installed) variants next to it.
+References from stylesheets and scripts to other assets, i.e. CSS url() and
+sourceMappingURL comments, are rewritten to the hashed names of the referenced
+assets, which are built first.
+A manifest maps the original relative paths to the hashed paths, which templates use through static_url.
+"""
+import datetime
+import email.utils
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from bogoapp import settings
+
+
+logger = logging.getLogger("assets")
+
+MANIFEST_NAME = "manifest.json"
+COMPRESSIBLE_EXTENSIONS = (".js", ".css", ".map", ".svg", ".html", ".json", ".txt")
+# Ordered by preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+SOURCE_MAP_PATTERN = re.compile(rb"(sourceMappingURL=)([^\s'\"*]+)")
+CSS_URL_PATTERN = re.compile(rb"(url\(\s*['\"]?)([^'\")\s]+)")
+# Patterns of references to other assets by file extension
+REFERENCE_PATTERNS = {".css": (CSS_URL_PATTERN, SOURCE_MAP_PATTERN),
+                      ".js": (SOURCE_MAP_PATTERN, )}
+
+
+def content_hash(data):
+    """
+    >>> content_hash(b"bogo")
+    'ce10b2d9c638'
+    """
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def hashed_name(relative_path, digest):
+    """
+    >>> hashed_name("js/main.js", "abc")
+    'js/main.abc.js'
+    >>> hashed_name("js/vendor/p5.min.js", "abc")
+    'js/vendor/p5.min.abc.js'
+    """
+    root, extension = os.path.splitext(relative_path)
+    return "{}.{}{}".format(root, digest, extension)
+
+
+def accepted_encodings(accept_encoding):
+    """
+    Return the set of content codings accepted by an Accept-Encoding header value.
+    >>> sorted(accepted_encodings("gzip, deflate, br;q=1.0, identity;q=0"))
+    ['br', 'deflate', 'gzip']
+    """
+    accepted = set()
+    for coding in (accept_encoding or "").split(","):
+        name, *params = (part.strip() for part in coding.split(";"))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0 and name and name != "identity":
+            accepted.add(name.lower())
+    return accepted
+
+
+def http_date(timestamp):
+    """
+    >>> http_date(0)
+    'Thu, 01 Jan 1970 00:00:00 GMT'
+    """
+    return email.utils.formatdate(timestamp, usegmt=True)
+
+
+def modified_since(timestamp, if_modified_since):
+    """
+    Return False if the If-Modified-Since header shows that the client already
+    has the file modified at timestamp, which is compared in whole seconds.
+    >>> modified_since(60.5, http_date(60))
+    False
+    >>> modified_since(61, http_date(60))
+    True
+    >>> modified_since(60, None), modified_since(60, "yesterday")
+    (True, True)
+    """
+    if not if_modified_since:
+        return True
+    try:
+        since = email.utils.parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return True
+    if since is None:
+        return True
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=datetime.timezone.utc)
+    return int(timestamp) > since.timestamp()
+
+
+def referenced_path(relative_path, reference):
+    """
+    Return the relative path of the static asset referenced from the asset
+    at relative_path and the query and fragment suffix of the reference,
+    or None if the reference is not a relative URL.
+    >>> referenced_path("css/bootstrap.min.css", "../fonts/icons.eot?#iefix")
+    ('fonts/icons.eot', '?#iefix')
+    >>> referenced_path("js/vendor/underscore-min.js", "underscore-min.map")
+    ('js/vendor/underscore-min.map', '')
+    >>> referenced_path("css/main.css", "data:image/png;base64,AA==") is None
+    True
+    """
+    if reference.startswith(("/", "#")) or re.match(r"^[a-zA-Z][a-zA-Z0-9+.-]*:", reference):
+        return None
+    split = re.search(r"[?#]", reference)
+    path, suffix = (reference[:split.start()], reference[split.start():]) if split else (reference, "")
+    path = posixpath.normpath(posixpath.join(posixpath.dirname(relative_path), path))
+    if path.startswith("../"):
+        return None
+    return path, suffix
+
+
+def _static_files(static_path, skip_paths):
+    for directory, subdirectories, filenames in os.walk(static_path):
+        subdirectories[:] = sorted(d for d in subdirectories
+                                   if os.path.abspath(os.path.join(directory, d)) not in skip_paths)
+        for filename in sorted(filenames):
+            path = os.path.join(directory, filename)
+            yield os.path.relpath(path, static_path).replace(os.sep, "/"), path
+
+
+def build(static_path, build_path, skip_paths=()):
+    """
+    Not async. Write content hashed and precompressed copies of all files in static_path
+    into build_path and return the manifest.
+    """
+    logger.info("Building static assets from %s into %s", static_path, build_path)
+    skip_paths = {os.path.abspath(os.path.join(static_path, p)) for p in skip_paths}
+    skip_paths.add(os.path.abspath(build_path))
+    if os.path.exists(build_path):
+        shutil.rmtree(build_path)
+    sources = dict(_static_files(static_path, skip_paths))
+    manifest = {}
+    for relative_path in sources:
+        _build_asset(relative_path, sources, build_path, manifest, building=set())
+    with open(os.path.join(build_path, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    logger.info("Built %d static assets", len(manifest))
+    return manifest
+
+
+def _rewrite_references(relative_path, data, sources, build_path, manifest, building):
+    """
+    Build the assets referenced from the asset at relative_path and replace
+    the references in data with the hashed names relative to the hashed asset.
+    """
+    patterns = REFERENCE_PATTERNS.get(os.path.splitext(relative_path)[1], ())
+    if not patterns:
+        return data
+    building.add(relative_path)
+
+    def rewrite(match):
+        reference = match.group(2).decode("utf-8")
+        referenced = referenced_path(relative_path, reference)
+        if referenced is None:
+            return match.group(0)
+        path, suffix = referenced
+        if path not in sources or path in building:
+            if path not in sources:
+                logger.warning("%s references missing asset %s", relative_path, reference)
+            return match.group(0)
+        hashed_path = _build_asset(path, sources, build_path, manifest, building)
+        hashed_reference = posixpath.relpath(hashed_path, posixpath.dirname(relative_path))
+        return match.group(1) + (hashed_reference + suffix).encode("utf-8")
+
+    for pattern in patterns:
+        data = pattern.sub(rewrite, data)
+    building.discard(relative_path)
+    return data
+
+
+def _build_asset(relative_path, sources, build_path, manifest, building):
+    """Write the hashed and compressed copies of an asset, unless already built, and return its hashed path."""
+    if relative_path in manifest:
+        return manifest[relative_path]
+    with open(sources[relative_path], "rb") as f:
+        data = f.read()
+    data = _rewrite_references(relative_path, data, sources, build_path, manifest, building)
+    target_name = hashed_name(relative_path, content_hash(data))
+    target_path = os.path.join(build_path, target_name)
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    with open(target_path, "wb") as f:
+        f.write(data)
+    if relative_path.endswith(COMPRESSIBLE_EXTENSIONS):
+        with open(target_path + ".gz", "wb") as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(target_path + ".br", "wb") as f:
+                f.write(brotli.compress(data))
+    manifest[relative_path] = target_name
+    return target_name
+
+
+class AssetManifest:
+    """
+    Resolves static asset paths to their built variants.
+    Without a built manifest, all assets are served as is.
+    """
+
+    def __init__(self, static_path, build_path, url_prefix="/static"):
+        self.static_path = os.path.abspath(static_path)
+        self.build_path = os.path.abspath(build_path)
+        self.build_prefix = os.path.relpath(self.build_path, self.static_path).replace(os.sep, "/")
+        self.url_prefix = url_prefix
+        self.manifest = {}
+        manifest_path = os.path.join(self.build_path, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            logger.warning("No static asset manifest found at %s, "
+                           "serving unhashed and uncompressed assets", manifest_path)
+
+    def url(self, relative_path):
+        """Return the URL of the static asset, which is content hashed if it has been built."""
+        hashed_path = self.manifest.get(relative_path)
+        if hashed_path is None:
+            return "{}/{}".format(self.url_prefix, relative_path)
+        return "{}/{}/{}".format(self.url_prefix, self.build_prefix, hashed_path)
+
+    def is_hashed(self, relative_path):
+        return relative_path.startswith(self.build_prefix + "/")
+
+    def resolve(self, relative_path, accept_encoding=None):
+        """
+        Return a (path, content encoding) pair for the requested asset,
+        or None if it does not exist inside the static directory.
+        The content encoding is None if no precompressed variant is accepted.
+        """
+        path = os.path.abspath(os.path.join(self.static_path, relative_path))
+        if os.path.commonpath((path, self.static_path)) != self.static_path:
+            return None
+        if not os.path.isfile(path):
+            return None
+        if self.is_hashed(relative_path):
+            accepted = accepted_encodings(accept_encoding)
+            for encoding, suffix in ENCODINGS:
+                if encoding in accepted and os.path.isfile(path + suffix):
+                    return path + suffix, encoding
+        return path, None
+
+    def headers(self, relative_path, encoding, modified=None):
+        """
+        Hashed assets are cached forever, unhashed assets are revalidated with
+        their modification time.
+        """
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        if self.is_hashed(relative_path):
+            headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        elif modified is not None:
+            headers["Last-Modified"] = http_date(modified)
+        return headers
+
+    @staticmethod
+    def mime_type(relative_path):
+        mime_type, _ = mimetypes.guess_type(relative_path)
+        return mime_type or "application/octet-stream"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    build(settings.STATIC_PATH,
+          settings.STATIC_BUILD_PATH,
+          skip_paths=settings.STATIC_BUILD_SKIP)
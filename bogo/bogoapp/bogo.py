@@ -12,31 +12,39 @@ class Bogo:
                  sequence=None,
                  created=None,
                  finished=None,
-                 shuffles=0):
+                 shuffles=0,
+                 algorithm="bogosort"):
         self.db_id = db_id
         self.sequence = sequence
         self.created = created
         self.finished = finished
         self.shuffles = shuffles
+        self.algorithm = algorithm
 
     @classmethod
     def from_database_row(cls, row):
         sequence = ast.literal_eval(row[1])
-        return cls(row[0], sequence, *row[2:])
+        # Timestamps are epoch microseconds, but rows written before the
+        # integer migration may still contain isoformatted strings.
+        created = tools.as_epoch_micros(row[2])
+        finished = tools.as_epoch_micros(row[3])
+        return cls(row[0], sequence, created, finished, *row[4:])
 
     def as_database_row(self):
         return (self.db_id,
                 repr(self.sequence),
                 self.created,
                 self.finished,
-                self.shuffles)
+                self.shuffles,
+                self.algorithm)
 
     def as_dict(self):
         return {"id": self.db_id,
                 "seq": self.sequence,
-                "created": self.created,
-                "finished": self.finished,
-                "shuffles": self.shuffles}
+                "created": tools.isoformat_from_epoch_micros(self.created),
+                "finished": tools.isoformat_from_epoch_micros(self.finished),
+                "shuffles": self.shuffles,
+                "algorithm": self.algorithm}
 
     def shuffle_with(self, shuffle):
         shuffle(self.sequence)
@@ -2,12 +2,14 @@
 Fear and loathing.
 """
 import ast
-import asyncio
 import logging
 import time
 
+from bogoapp import algorithms
+from bogoapp import metrics
 from bogoapp import tools
 from bogoapp.bogo import Bogo
+from bogoapp.scheduler import AdaptiveScheduler
 
 logger = logging.getLogger("BogoManager")
 
@@ -24,15 +26,40 @@ class BogoManager:
                  unsorted_lists,
                  speed_resolution,
                  database,
-                 random_module):
+                 random_module,
+                 scheduler=None,
+                 algorithm="bogosort",
+                 registry=None,
+                 algorithm_options=None,
+                 checkpoint_interval=60.0):
         if speed_resolution <= 0:
             raise BogoError("Invalid speed resolution, "
                             "N shuffles per {} seconds doesn't make sense."
                             .format(speed_resolution))
+        if algorithm not in algorithms.ALGORITHMS:
+            raise BogoError("Unknown sorting algorithm {}, expected one of {}."
+                            .format(repr(algorithm), ", ".join(sorted(algorithms.ALGORITHMS))))
         self.unsorted_lists = unsorted_lists
         self.speed_resolution = speed_resolution
         self.database = database
         self.random = random_module
+        if scheduler is None:
+            scheduler = AdaptiveScheduler()
+        self.scheduler = scheduler
+        self.algorithm = algorithm
+        self.algorithms = {}
+        # Keyword arguments of each algorithm by name
+        if algorithm_options is None:
+            algorithm_options = {}
+        self.algorithm_options = algorithm_options
+        # Seconds between saving the progress of checkpointed algorithms
+        self.checkpoint_interval = checkpoint_interval
+        self.current_algorithm = None
+        # Expected total steps of sorting the current bogo
+        self.current_expected_steps = None
+        if registry is None:
+            registry = metrics.Registry()
+        self.registry = registry
 
         self.current_bogo = None
         self.stopping = False
@@ -61,37 +88,95 @@ class BogoManager:
         logging.info(f"Returning previous bogo {bogo}")
         return bogo
 
+    async def restore_random_state(self, bogo_id):
+        """
+        Set the random module state to the newest state saved at or before the
+        bogo with the given id and return the id of the bogo of that state,
+        or None if there is no such state.
+        """
+        random_state_row = await self.database.random_state_at(bogo_id)
+        if not random_state_row:
+            return None
+        self.random.setstate(ast.literal_eval(random_state_row[1]))
+        return random_state_row[3]
+
     async def save_state(self, now):
         logging.debug("Saving state.")
         random_state = self.random.getstate()
-        await self.database.save_state(self.current_bogo, random_state, now)
+        checkpoint = None
+        if self.current_algorithm is not None:
+            checkpoint = self.current_algorithm.checkpoint()
+        await self.database.save_state(self.current_bogo, random_state, now, checkpoint)
 
     async def make_next_bogo(self, sequence):
         logging.debug(f"Making new bogo from sequence {sequence}.")
-        now = tools.isoformat_now()
-        self.current_bogo = Bogo(sequence=sequence, created=now)
+        now = tools.epoch_micros_now()
+        self.current_bogo = Bogo(sequence=sequence, created=now, algorithm=self.algorithm)
+        self.current_algorithm = None
+        self.current_expected_steps = None
         await self.save_state(now=now)
         self.current_bogo.db_id = (await self.database.newest_bogo())[0]
 
+    def algorithm_for(self, bogo):
+        """Return the sorting algorithm instance used for sorting bogo."""
+        algorithm = self.algorithms.get(bogo.algorithm)
+        if algorithm is None:
+            options = self.algorithm_options.get(bogo.algorithm, {})
+            algorithm = algorithms.make_algorithm(bogo.algorithm, self.random, **options)
+            self.algorithms[bogo.algorithm] = algorithm
+        return algorithm
+
     async def sort_current_until_done(self):
-        """Bogosort the current sequence until it is sorted."""
+        """Sort the current sequence with its algorithm until it is sorted."""
         logging.debug("Sorting current bogo until done.")
+        algorithm = self.algorithm_for(self.current_bogo)
+        checkpoint = None
+        if algorithm.checkpointed and self.current_bogo.db_id is not None:
+            checkpoint = await self.database.enumeration_checkpoint(self.current_bogo.db_id)
+        algorithm.reset(self.current_bogo.sequence, checkpoint)
+        if checkpoint is not None:
+            # The saved bogo may be older or newer than the checkpoint
+            self.current_bogo.shuffles = checkpoint.steps
+        elif algorithm.checkpointed and self.current_bogo.db_id is not None:
+            # Save the starting sequence before the saved bogo diverges from it
+            await self.database.save_enumeration_checkpoint(
+                    self.current_bogo.db_id, algorithm.checkpoint(), tools.epoch_micros_now())
+        self.current_algorithm = algorithm
+        self.current_expected_steps = (self.current_bogo.shuffles
+                                       + algorithm.expected_steps(self.current_bogo.sequence))
         delta_iterations = 0
         delta_seconds = 0.0
-        while not (self.current_bogo.is_finished() or self.stopping):
-            await asyncio.sleep(1e-100)
+        checkpointed_at = time.perf_counter()
+        while not (self.current_bogo.is_finished() or algorithm.exhausted() or self.stopping):
+            await self.scheduler.yield_to_loop()
             perf_counter_start = time.perf_counter()
-            self.current_bogo.shuffle_with(self.random.shuffle)
-            delta_iterations += 1
-            delta_seconds += time.perf_counter() - perf_counter_start
+            deadline = self.scheduler.deadline()
+            perf_counter_now = perf_counter_start
+            slice_iterations = 0
+            while (perf_counter_now < deadline
+                   and not (self.current_bogo.is_finished() or algorithm.exhausted())):
+                self.current_bogo.shuffle_with(algorithm.step)
+                slice_iterations += 1
+                perf_counter_now = time.perf_counter()
+            delta_iterations += slice_iterations
+            delta_seconds += perf_counter_now - perf_counter_start
+            self.registry.increment("algorithm_steps", algorithm.name, slice_iterations)
+            self.registry.increment("algorithm_seconds", algorithm.name,
+                                    perf_counter_now - perf_counter_start)
             if delta_seconds >= self.speed_resolution:
                 delta_iterations = 0
                 delta_seconds = 0.0
+            if algorithm.checkpointed and perf_counter_now - checkpointed_at >= self.checkpoint_interval:
+                await self.save_state(tools.epoch_micros_now())
+                checkpointed_at = perf_counter_now
         logging.debug("Stopped sorting bogo.")
-        now = tools.isoformat_now()
+        now = tools.epoch_micros_now()
         if self.current_bogo.is_finished():
             logging.debug("Bogo was sorted")
             self.current_bogo.finished = now
+            self.registry.increment("algorithm_bogos", algorithm.name)
+        elif algorithm.exhausted():
+            logging.info("Enumerated all permutations of this part without finding the sorted one.")
         else:
             logging.debug("Bogo was not sorted")
         await self.save_state(now)
@@ -122,7 +207,34 @@ class BogoManager:
             logging.info("Did not find an unfinished previous bogo.")
         await self.sort_all()
 
+    def algorithm_statistics(self):
+        """
+        Return the throughput of each algorithm used so far and the expected
+        work of sorting the current bogo.
+        """
+        steps = self.registry.counters["algorithm_steps"]
+        seconds = self.registry.counters["algorithm_seconds"]
+        finished = self.registry.counters["algorithm_bogos"]
+        statistics = {name: {"steps": steps[name],
+                             "seconds": seconds[name],
+                             "steps_per_second": steps[name] / seconds[name] if seconds[name] else None,
+                             "finished_bogos": finished[name]}
+                      for name in steps}
+        current = None
+        if self.current_bogo is not None:
+            algorithm = algorithms.ALGORITHMS[self.current_bogo.algorithm]
+            current = {"algorithm": algorithm.name,
+                       "length": len(self.current_bogo.sequence),
+                       "steps": self.current_bogo.shuffles,
+                       "expected_steps": self.current_expected_steps,
+                       "expected_steps_is_estimate": algorithm.expected_steps_is_estimate}
+            if self.current_algorithm is not None and self.current_algorithm.checkpointed:
+                current["enumeration"] = self.current_algorithm.as_dict()
+        return {"algorithms": statistics, "current": current}
+
     def get_current_state(self):
+        if self.current_bogo is None:
+            return (0, False)
         return (self.current_bogo.shuffles,
                 self.current_bogo.is_finished())
 
@@ -1,30 +1,70 @@
 """
 Simple async database connections for saving and retrieving sorting state.
 """
+import ast
 import asyncio
-import itertools
+import os.path
 import sqlite3
 import logging
 
-import aioodbc
+from bogoapp import algorithms
+from bogoapp import metrics
+from bogoapp import tools
 
 
 logger = logging.getLogger("Database")
 
+RANDOM_SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "random_schema.sql")
+
+
+def sql_statements(source):
+    """
+    Split an SQL script into complete statements, which can be executed one
+    at a time inside a transaction, unlike with executescript.
+    >>> sql_statements("create table t (x);\\ncreate trigger r after insert on t begin delete from t; end;")
+    ['create table t (x);', 'create trigger r after insert on t begin delete from t; end;']
+    """
+    statements = []
+    statement = ""
+    for line in source.splitlines():
+        if line.lstrip().startswith("--"):
+            continue
+        statement += line + "\n"
+        if sqlite3.complete_statement(statement):
+            statements.append(" ".join(statement.split()))
+            statement = ""
+    return statements
+
 
 class Database:
 
-    def __init__(self, dsn, sql_schema_path):
+    def __init__(self,
+                 dsn,
+                 sql_schema_path,
+                 registry=None,
+                 recent_random_states=10,
+                 keep_every_random_state=100):
         self.data_source_name = dsn
         self.sql_schema_path = sql_schema_path
-        self.random_state_ids = itertools.cycle(range(1, 11))
+        if registry is None:
+            registry = metrics.Registry()
+        self.registry = registry
+        self.recent_random_states = recent_random_states
+        self.keep_every_random_state = keep_every_random_state
 
     async def execute_sql(self, command, data=(), commit=False):
         """
         Execute an SQL command asynchronously on the database.
         If commit is given and True, commit after executing the command and return None.
         Else, do fetchall after executing the command and return the results.
+        The duration of each command is recorded in the "sql" metrics group.
         """
+        with self.registry.timer("sql", command):
+            return await self._execute_sql(command, data, commit)
+
+    async def _execute_sql(self, command, data, commit):
+        # Imported lazily since loading the ODBC driver is slow
+        import aioodbc
         dsn = self.data_source_name
         loop = asyncio.get_event_loop()
         async with aioodbc.create_pool(dsn=dsn, loop=loop) as pool:
@@ -36,76 +76,227 @@ class Database:
                     await connection.commit()
                     return None
 
-    def init(self):
+    @property
+    def database_path(self):
+        return self.data_source_name.split("Database=")[-1]
+
+    async def setup(self):
+        """
+        Initialize the database if it does not exist, else migrate it.
+        Blocking sqlite3 work is run in the default executor so the event loop
+        can serve requests while the database is being prepared.
+        """
+        if not os.path.exists(self.database_path):
+            logging.info("No database found.")
+            await self.init()
+        else:
+            logging.info("Found existing database.")
+            await self.migrate()
+
+    async def init(self):
         """
-        Not async. Run and commit the SQL schema script.
-        Fast forward random state ids.
+        Run and commit the SQL schema script.
+        Apply the random state retention.
         """
         logging.info("Initializing empty database.")
-        database_path = self.data_source_name.split("Database=")[-1]
-        connection = sqlite3.connect(database_path)
-        with open(self.sql_schema_path) as schema:
-            schema_source = schema.read()
-        connection.executescript(schema_source)
-        connection.commit()
-        self.fast_forward_ids()
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.run_schema)
+        await loop.run_in_executor(None, self.apply_random_retention)
         logging.info("Initialized empty database.")
 
-    def fast_forward_ids(self):
+    async def migrate(self):
         """
-        Not async. If the database contains non-null random state rows,
-        fast forward the id generator to the next new value.
+        Convert isoformatted text timestamps written by older versions into
+        integer epoch microseconds and create the timestamp indexes if they
+        are missing.
+        Convert the random state ring of older versions into the random state
+        history and apply the random state retention.
+        Add the sorting algorithm column and the enumeration checkpoint table.
         """
-        logging.info("Fast forwarding random state row ids.")
+        logging.info("Migrating database.")
         loop = asyncio.get_event_loop()
-        newest_random_state = loop.run_until_complete(self.newest_random_state())
-        if newest_random_state and newest_random_state[1]:
-            newest_id = newest_random_state[0]
-            logging.debug(f"Newest random state has id {newest_id}.")
-            self.random_state_ids = itertools.dropwhile(
-                    lambda i: i != newest_id,
-                    self.random_state_ids)
-            next(self.random_state_ids)
+        await loop.run_in_executor(None, self.migrate_timestamps)
+        await loop.run_in_executor(None, self.migrate_random_history)
+        await loop.run_in_executor(None, self.migrate_algorithm_column)
+        await loop.run_in_executor(None, self.migrate_enumeration_table)
+        await loop.run_in_executor(None, self.apply_random_retention)
+        logging.info("Migrated database.")
+
+    def run_schema(self):
+        """Not async. Run and commit the SQL schema script and the random state schema script."""
+        connection = sqlite3.connect(self.database_path)
+        for schema_path in (self.sql_schema_path, RANDOM_SCHEMA_PATH):
+            with open(schema_path) as schema:
+                schema_source = schema.read()
+            connection.executescript(schema_source)
+        connection.commit()
+        connection.close()
+
+    def migrate_timestamps(self):
+        """Not async. Convert text timestamps and create missing indexes."""
+        connection = sqlite3.connect(self.database_path)
+        connection.create_function("epoch_micros", 1,
+                                   tools.epoch_micros_from_isoformat,
+                                   deterministic=True)
+        with connection:
+            for table, column in (("bogos", "created"),
+                                  ("bogos", "finished"),
+                                  ("random", "saved")):
+                connection.execute(f"update {table} "
+                                   f"set {column}=epoch_micros({column}) "
+                                   f"where typeof({column})='text'")
+            connection.execute("create index if not exists bogos_created "
+                               "on bogos(created)")
+        connection.close()
+
+    def migrate_random_history(self):
+        """
+        Not async. Replace the ring of 10 random state rows, used by older
+        versions, with the random state history from the random state schema
+        script, keeping all saved states.
+        The old table is copied into the new one in a single transaction.
+        """
+        connection = sqlite3.connect(self.database_path, isolation_level=None)
+        has_history = connection.execute(
+                "select count(*) from sqlite_master "
+                "where type='table' and name='random_retention'").fetchone()[0]
+        if not has_history:
+            logging.info("Migrating random state ring into random state history.")
+            with open(RANDOM_SCHEMA_PATH) as schema:
+                random_statements = sql_statements(schema.read())
+            connection.execute("begin")
+            try:
+                connection.execute("alter table random rename to random_ring")
+                for statement in random_statements:
+                    connection.execute(statement)
+                connection.execute("insert into random (state, saved, bogo) "
+                                   "select state, saved, bogo from random_ring "
+                                   "where state is not null and bogo is not null "
+                                   "order by bogo")
+                connection.execute("drop table random_ring")
+            except Exception:
+                connection.execute("rollback")
+                raise
+            connection.execute("commit")
+        connection.close()
+
+    def migrate_algorithm_column(self):
+        """Not async. Add the sorting algorithm column, bogos of older versions were bogosorted."""
+        connection = sqlite3.connect(self.database_path)
+        with connection:
+            columns = [row[1] for row in connection.execute("pragma table_info(bogos)")]
+            if "algorithm" not in columns:
+                logging.info("Adding sorting algorithm column to bogos.")
+                connection.execute("alter table bogos add column "
+                                   "algorithm text not null default 'bogosort'")
+        connection.close()
+
+    def migrate_enumeration_table(self):
+        """
+        Not async. Create the enumeration checkpoint table if it is missing.
+        Checkpoints of older versions without the starting sequence cannot be
+        resumed reliably and are dropped, such enumerations restart their part.
+        """
+        connection = sqlite3.connect(self.database_path)
+        with connection:
+            columns = [row[1] for row in connection.execute("pragma table_info(enumeration)")]
+            if columns and "base" not in columns:
+                logging.warning("Dropping enumeration checkpoints without starting sequences.")
+                connection.execute("drop table enumeration")
+            connection.execute("create table if not exists enumeration ("
+                               "bogo integer primary key, "
+                               "base text not null, "
+                               "start integer not null, "
+                               "position integer not null, "
+                               "stop integer not null, "
+                               "saved integer not null, "
+                               "foreign key(bogo) references bogos(id))")
+        connection.close()
+
+    def apply_random_retention(self):
+        """Not async. Write the random state retention settings into the database."""
+        connection = sqlite3.connect(self.database_path)
+        with connection:
+            connection.execute("update random_retention set recent=?, every=?",
+                               (self.recent_random_states, self.keep_every_random_state))
+        connection.close()
 
     # TODO separate random state and bogo saving
-    async def save_state(self, bogo, random_state, now):
+    async def save_state(self, bogo, random_state, now, checkpoint=None):
+        """
+        Save the bogo and the random module state.
+        If checkpoint is given, it is the progress of an enumerating algorithm
+        sorting the bogo.
+        """
         logging.debug(f"Writing state into database for bogo with id {bogo.db_id}.")
         row = bogo.as_database_row()
         if await self.exists(bogo):
             bogo_command = ("update bogos set "
-                            "sequence=?, created=?, finished=?, shuffles=? "
+                            "sequence=?, created=?, finished=?, shuffles=?, algorithm=? "
                             "where id=?")
             bogo_id = row[0]
             bogo_data = (*row[1:], bogo_id)
         else:
+            bogo_id = None
             bogo_command = ("insert into bogos "
-                            "(sequence, created, finished, shuffles) "
-                            "values (?, ?, ?, ?)")
+                            "(sequence, created, finished, shuffles, algorithm) "
+                            "values (?, ?, ?, ?, ?)")
             # Drop id placeholder
             bogo_data = row[1:]
         await self.execute_sql(bogo_command, bogo_data, commit=True)
-        bogo_id = (await self.newest_bogo())[0]
-        if await self.exists_random_state(bogo_id):
-            rand_command = ("update random set "
-                            "state=?, saved=? "
-                            "where bogo=?")
-            rand_data = (repr(random_state), now, bogo_id)
-        else:
-            rand_command = ("update random set "
-                            "state=?, saved=?, bogo=? "
-                            "where id=?")
-            next_rand_id = next(self.random_state_ids)
-            rand_data = (repr(random_state), now, bogo_id, next_rand_id)
+        if bogo_id is None:
+            bogo_id = (await self.newest_bogo())[0]
+        rand_command = ("insert into random (state, saved, bogo) "
+                        "values (?, ?, ?) "
+                        "on conflict(bogo) do update set "
+                        "state=excluded.state, saved=excluded.saved")
+        rand_data = (repr(random_state), now, bogo_id)
         await self.execute_sql(rand_command, rand_data, commit=True)
+        if checkpoint is not None:
+            await self.save_enumeration_checkpoint(bogo_id, checkpoint, now)
+
+    async def save_enumeration_checkpoint(self, bogo_id, checkpoint, now):
+        """
+        Save the progress of an enumerating algorithm sorting the given bogo.
+        The checkpoint contains the starting sequence, so the current sequence
+        can be rebuilt from it, even if the saved bogo is older or newer.
+        """
+        enumeration_command = ("insert into enumeration (bogo, base, start, position, stop, saved) "
+                               "values (?, ?, ?, ?, ?, ?) "
+                               "on conflict(bogo) do update set "
+                               "base=excluded.base, start=excluded.start, "
+                               "position=excluded.position, stop=excluded.stop, "
+                               "saved=excluded.saved")
+        enumeration_data = (bogo_id, repr(checkpoint.base), checkpoint.start,
+                            checkpoint.position, checkpoint.stop, now)
+        await self.execute_sql(enumeration_command, enumeration_data, commit=True)
 
     async def query_and_get_first(self, query, data=()):
         results = await self.execute_sql(query, data)
         return results[0] if results else None
 
     async def exists_random_state(self, bogo_id):
+        return (await self.random_state_by_bogo_id(bogo_id)) is not None
+
+    async def random_state_by_bogo_id(self, bogo_id):
         select_with_foreign_key = "select * from random where bogo=?"
-        rand_state = await self.query_and_get_first(select_with_foreign_key, (bogo_id, ))
-        return rand_state is not None
+        return await self.query_and_get_first(select_with_foreign_key, (bogo_id, ))
+
+    async def random_state_at(self, bogo_id):
+        """
+        Return the newest random state saved for the given bogo or an older one,
+        if the state of the given bogo has been thinned out.
+        """
+        select_nearest = "select * from random where bogo<=? order by bogo desc limit 1"
+        return await self.query_and_get_first(select_nearest, (bogo_id, ))
+
+    async def enumeration_checkpoint(self, bogo_id):
+        """Return the saved progress of enumerating the given bogo, or None."""
+        select_checkpoint = "select base, start, position, stop from enumeration where bogo=?"
+        row = await self.query_and_get_first(select_checkpoint, (bogo_id, ))
+        if not row:
+            return None
+        return algorithms.Checkpoint(ast.literal_eval(row[0]), *row[1:])
 
     async def bogo_by_id(self, bogo_id):
         select_with_id = "select * from bogos where id=?"
@@ -119,16 +310,16 @@ class Database:
         return await self.query_and_get_first(select_newest)
 
     async def newest_random_state(self):
-        select_newest = "select * from random order by saved desc limit 1"
+        select_newest = "select * from random order by bogo desc limit 1"
         return await self.query_and_get_first(select_newest)
 
     async def newer_bogo(self, bogo):
         select_next = "select * from bogos where created > ? order by created limit 1"
-        return await self.query_and_get_first(select_next, (bogo['created'], ))
+        return await self.query_and_get_first(select_next, (bogo.created, ))
 
     async def older_bogo(self, bogo):
         select_previous = "select * from bogos where created < ? order by created desc limit 1"
-        return await self.query_and_get_first(select_previous, (bogo['created'], ))
+        return await self.query_and_get_first(select_previous, (bogo.created, ))
 
     async def adjacent_bogos(self, bogo):
         return (await self.older_bogo(bogo),
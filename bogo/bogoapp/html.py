@@ -1,21 +1,107 @@
+import collections
 import logging
-import jinja2
+import os
+
+from bogoapp import metrics
 
 
 logger = logging.getLogger("JinjaWrapper")
 
 
 class JinjaWrapper:
+    """
+    Renders templates into bytes and caches the results.
+    Templates rendered without a context are cached indefinitely,
+    templates rendered with a context are cached in a bounded LRU keyed by the context items.
+    """
+
+    def __init__(self,
+                 template_path=None,
+                 bytecode_cache_path=None,
+                 cache_size=128,
+                 template_globals=None,
+                 registry=None):
+        self.template_path = template_path
+        self.bytecode_cache_path = bytecode_cache_path
+        self.template_globals = template_globals
+        self._env = None
+        self.templates = {}
+        self.static_pages = {}
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        if registry is None:
+            registry = metrics.Registry()
+        self.registry = registry
 
-    def __init__(self, template_path=None):
-        if template_path is None:
+    @property
+    def env(self):
+        """The Jinja environment, created on first use since importing jinja2 is slow."""
+        if self._env is None:
+            self._env = self.make_env()
+        return self._env
+
+    def make_env(self):
+        import jinja2
+        if self.template_path is None:
             loader = jinja2.PackageLoader("bogoapp", "templates")
         else:
-            loader = jinja2.FileSystemLoader(template_path)
-        self.env = jinja2.Environment(loader=loader, enable_async=True)
+            loader = jinja2.FileSystemLoader(self.template_path)
+        bytecode_cache = None
+        if self.bytecode_cache_path is not None:
+            os.makedirs(self.bytecode_cache_path, exist_ok=True)
+            bytecode_cache = jinja2.FileSystemBytecodeCache(self.bytecode_cache_path)
+        env = jinja2.Environment(loader=loader,
+                                 bytecode_cache=bytecode_cache,
+                                 auto_reload=False,
+                                 enable_async=True)
+        if self.template_globals is not None:
+            env.globals.update(self.template_globals)
+        return env
+
+    def precompile(self):
+        """
+        Compile all templates, writing them into the bytecode cache if one is used.
+        """
+        logger.debug("Precompiling templates")
+        for template_name in self.env.list_templates(extensions=("html", )):
+            self.get_template(template_name)
+        logger.debug("Precompiled %d templates", len(self.templates))
+
+    def get_template(self, template_name):
+        template = self.templates.get(template_name)
+        if template is None:
+            template = self.env.get_template(template_name)
+            self.templates[template_name] = template
+        return template
+
+    async def render_uncached(self, template_name, context):
+        template = self.get_template(template_name)
+        rendered = await template.render_async(**context)
+        return rendered.encode("utf-8")
 
     async def render(self, template_name, context):
-        if context is None:
-            context = {}
-        template = self.env.get_template(template_name)
-        return await template.render_async(**context)
+        with self.registry.timer("templates", template_name):
+            return await self._render(template_name, context)
+
+    async def _render(self, template_name, context):
+        if not context:
+            rendered = self.static_pages.get(template_name)
+            if rendered is None:
+                self.registry.increment("template_cache", "misses")
+                rendered = await self.render_uncached(template_name, {})
+                self.static_pages[template_name] = rendered
+            else:
+                self.registry.increment("template_cache", "hits")
+            return rendered
+        key = (template_name, tuple(sorted(context.items())))
+        rendered = self.cache.get(key)
+        if rendered is not None:
+            self.registry.increment("template_cache", "hits")
+            self.cache.move_to_end(key)
+            return rendered
+        self.registry.increment("template_cache", "misses")
+        rendered = await self.render_uncached(template_name, context)
+        self.cache[key] = rendered
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return rendered
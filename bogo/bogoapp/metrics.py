@@ -0,0 +1,133 @@
+"""
+Lightweight in-process metrics.
+"""
+import asyncio
+import bisect
+import collections
+import contextlib
+import functools
+import time
+
+
+# Upper bounds in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """
+    Counts of observed values in buckets with fixed upper bounds.
+    >>> h = Histogram((1, 2, 3))
+    >>> for value in (0.5, 1.5, 1.5, 2.5, 10):
+    ...     h.observe(value)
+    >>> h.count, h.max
+    (5, 10)
+    >>> h.quantile(0.5), h.quantile(0.8), h.quantile(1.0)
+    (2, 3, 10)
+    """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        # Last bucket counts values larger than all bounds
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """
+        Return the upper bound of the bucket containing the q-quantile,
+        or the maximum observed value if it is larger than all bounds.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return self.max
+
+    def as_dict(self):
+        return {"count": self.count,
+                "sum": self.sum,
+                "max": self.max,
+                "p50": self.quantile(0.5),
+                "p99": self.quantile(0.99),
+                "buckets": [[bound, count]
+                            for bound, count in zip(self.bounds + ("inf", ), self.counts)]}
+
+
+class Registry:
+    """
+    Histograms and counters grouped by name, e.g. histograms of SQL statement
+    durations in the group "sql" keyed by the statement.
+    """
+
+    def __init__(self):
+        self.histograms = collections.defaultdict(dict)
+        self.counters = collections.defaultdict(collections.Counter)
+
+    def histogram(self, group, key):
+        histograms = self.histograms[group]
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram()
+        return histogram
+
+    def observe(self, group, key, value):
+        self.histogram(group, key).observe(value)
+
+    def increment(self, group, key, n=1):
+        self.counters[group][key] += n
+
+    @contextlib.contextmanager
+    def timer(self, group, key):
+        """Observe the duration of the with block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(group, key, time.perf_counter() - start)
+
+    def timed(self, group, key=None):
+        """Decorator observing the duration of each call of a coroutine function."""
+        def decorator(f):
+            name = key or f.__name__
+            @functools.wraps(f)
+            async def wrapper(*args, **kwargs):
+                with self.timer(group, name):
+                    return await f(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    async def sample_loop_lag(self, interval):
+        """
+        Sleep for interval seconds forever and observe how late the event loop
+        wakes up in the histogram "loop" "lag".
+        """
+        loop = asyncio.get_event_loop()
+        histogram = self.histogram("loop", "lag")
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            histogram.observe(max(0.0, loop.time() - start - interval))
+
+    def as_dict(self):
+        exported = {group: {key: histogram.as_dict()
+                            for key, histogram in histograms.items()}
+                    for group, histograms in self.histograms.items()}
+        for group, counter in self.counters.items():
+            exported.setdefault(group, {}).update(counter)
+        return exported
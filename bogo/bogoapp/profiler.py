@@ -0,0 +1,89 @@
+"""
+Sampling profiler which can be started and stopped while the app is running.
+Samples are dumped in the collapsed stack format understood by flamegraph.pl and speedscope.
+"""
+import collections
+import logging
+import sys
+import threading
+
+
+logger = logging.getLogger("SamplingProfiler")
+
+
+def collapse_stack(frame):
+    """
+    Return the stack of frame as a semicolon separated string, outermost frame first.
+    >>> collapse_stack(sys._getframe()).endswith(":<module>")
+    True
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append("{}:{}".format(code.co_filename, code.co_name))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of a thread every interval seconds from a background thread.
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.main_thread().ident
+        self.stacks = collections.Counter()
+        self.stacks_lock = threading.Lock()
+        self.sampler = None
+        self.stopping = threading.Event()
+
+    @property
+    def running(self):
+        return self.sampler is not None
+
+    def start(self):
+        if self.running:
+            return
+        logger.info("Starting sampling profiler with interval %f", self.interval)
+        self.stopping.clear()
+        self.sampler = threading.Thread(target=self.sample_until_stopped,
+                                        name="SamplingProfiler",
+                                        daemon=True)
+        self.sampler.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        logger.info("Stopping sampling profiler")
+        self.stopping.set()
+        self.sampler.join()
+        self.sampler = None
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is not None:
+            stack = collapse_stack(frame)
+            with self.stacks_lock:
+                self.stacks[stack] += 1
+
+    def sample_until_stopped(self):
+        while not self.stopping.wait(self.interval):
+            self.sample()
+
+    def clear(self):
+        with self.stacks_lock:
+            self.stacks.clear()
+
+    def collapsed(self):
+        """Return all samples as lines of collapsed stacks followed by their sample counts."""
+        with self.stacks_lock:
+            stacks = self.stacks.most_common()
+        return "".join("{} {}\n".format(stack, count) for stack, count in stacks)
+
+    def as_dict(self):
+        with self.stacks_lock:
+            samples = sum(self.stacks.values())
+        return {"running": self.running,
+                "interval": self.interval,
+                "samples": samples}
@@ -0,0 +1,31 @@
+-- Python random builtin module state, saved for each bogo when it is checkpointed.
+-- The state saved for a bogo is the state after its most recent checkpoint,
+-- i.e. the state at the start of the next bogo once the bogo is finished.
+drop table if exists random;
+create table random (
+  id       integer    primary key,
+  state    text       not null,
+  saved    integer    not null,
+  bogo     integer    not null unique,
+  foreign key(bogo) references bogos(id)
+);
+
+-- Retention of random states.
+-- States of the newest 'recent' bogos are all kept,
+-- of older bogos only the states of every 'every'th bogo are kept.
+drop table if exists random_retention;
+create table random_retention (
+  id       integer    primary key check (id = 1),
+  recent   integer    not null check (recent > 0),
+  every    integer    not null check (every > 0)
+);
+insert into random_retention values(1, 10, 100);
+
+-- Thin out old random states, since each state is large.
+drop trigger if exists random_thin;
+create trigger random_thin after insert on random
+begin
+  delete from random
+  where bogo <= new.bogo - (select recent from random_retention)
+    and bogo % (select every from random_retention) != 0;
+end;
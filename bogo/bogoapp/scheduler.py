@@ -0,0 +1,65 @@
+"""
+Cooperative scheduling of CPU bound work on the event loop.
+"""
+import asyncio
+import logging
+import time
+
+from bogoapp import metrics
+
+
+logger = logging.getLogger("AdaptiveScheduler")
+
+
+class AdaptiveScheduler:
+    """
+    Runs work in time boxed slices and yields to the event loop between slices.
+
+    A request arriving during a slice waits at most for the rest of the slice
+    plus the time the other ready callbacks take, which is observed as the
+    loop lag when the scheduler yields.
+    If the slice and the lag together exceed the target latency, the slice is
+    halved, else it is grown by a fraction, within the given bounds.
+    """
+
+    def __init__(self,
+                 target_latency=0.005,
+                 initial_slice=0.001,
+                 min_slice=0.0001,
+                 max_slice=0.05,
+                 growth=1.1):
+        if not 0 < min_slice <= initial_slice <= max_slice:
+            raise ValueError("Expected 0 < min_slice <= initial_slice <= max_slice, "
+                             f"got {min_slice}, {initial_slice} and {max_slice}.")
+        self.target_latency = target_latency
+        self.slice_seconds = initial_slice
+        self.min_slice = min_slice
+        self.max_slice = max_slice
+        self.growth = growth
+        self.loop_lag = metrics.Histogram()
+        self.slices = metrics.Histogram()
+
+    def adjust(self, lag):
+        if self.slice_seconds + lag > self.target_latency:
+            self.slice_seconds = max(self.min_slice, self.slice_seconds / 2)
+        else:
+            self.slice_seconds = min(self.max_slice, self.slice_seconds * self.growth)
+
+    async def yield_to_loop(self):
+        """Yield to the event loop, record the loop lag and adjust the slice length."""
+        start = time.perf_counter()
+        await asyncio.sleep(0)
+        lag = time.perf_counter() - start
+        self.loop_lag.observe(lag)
+        self.adjust(lag)
+
+    def deadline(self):
+        """Return the perf_counter value at which the current slice ends."""
+        self.slices.observe(self.slice_seconds)
+        return time.perf_counter() + self.slice_seconds
+
+    def as_dict(self):
+        return {"slice_seconds": self.slice_seconds,
+                "target_latency": self.target_latency,
+                "slices": self.slices.as_dict(),
+                "loop_lag": self.loop_lag.as_dict()}
@@ -1,3 +1,5 @@
+import os
+
 try:
     from bogoapp import local_settings
 except ImportError:
@@ -6,16 +8,62 @@ except ImportError:
 LOGO = getattr(local_settings, "LOGO", None)
 
 SQL_DRIVER_LIB = getattr(local_settings, "SQL_DRIVER_LIB", None)
-DATABASE_PATH = getattr(local_settings, "DATABASE_PATH", None)
+# Can be overridden from the environment, e.g. to run benchmarks against a throwaway database
+DATABASE_PATH = os.environ.get("BOGO_DATABASE_PATH",
+                               getattr(local_settings, "DATABASE_PATH", None))
 SQL_SCHEMA_PATH = getattr(local_settings, "SQL_SCHEMA_PATH", None)
 
+# Random module states of this many newest bogos are kept,
+# of older bogos only the states of every RANDOM_STATE_KEEP_EVERY-th bogo are kept.
+RANDOM_STATE_RECENT = getattr(local_settings, "RANDOM_STATE_RECENT", 10)
+RANDOM_STATE_KEEP_EVERY = getattr(local_settings, "RANDOM_STATE_KEEP_EVERY", 100)
+
 ODBC_DNS = f"Driver={SQL_DRIVER_LIB};Database={DATABASE_PATH}"
 
+# Number of Sanic worker processes, only one of them runs the sorter
+WORKERS = getattr(local_settings, "WORKERS", 1)
+SORTER_LOCK_PATH = getattr(local_settings, "SORTER_LOCK_PATH", f"{DATABASE_PATH}.sorter.lock")
+SHARED_STATE_PATH = getattr(local_settings, "SHARED_STATE_PATH", f"{DATABASE_PATH}.state")
+# Seconds between publishing the sorter state to other workers
+SHARED_STATE_INTERVAL = 0.05
+# Seconds between attempts of non-sorting workers to take over the sorter
+SORTER_ELECTION_INTERVAL = 1.0
+# Seconds a request waits for the app to become ready before responding with 503
+READY_TIMEOUT = getattr(local_settings, "READY_TIMEOUT", 10.0)
+
+STATIC_PATH = "static"
+STATIC_BUILD_PATH = "static/dist"
+STATIC_BUILD_SKIP = ("templates", "jsx")
+
 TEMPLATE_PATH = "static/templates"
+TEMPLATE_BYTECODE_CACHE_PATH = getattr(local_settings, "TEMPLATE_BYTECODE_CACHE_PATH", ".jinja_cache")
+TEMPLATE_CACHE_SIZE = getattr(local_settings, "TEMPLATE_CACHE_SIZE", 128)
+
+# Sorting runs in time boxed slices, adapted to keep the event loop latency under the target
+SCHEDULER_TARGET_LATENCY = getattr(local_settings, "SCHEDULER_TARGET_LATENCY", 0.005)
+SCHEDULER_INITIAL_SLICE = 0.001
+SCHEDULER_MIN_SLICE = 0.0001
+SCHEDULER_MAX_SLICE = 0.05
+
+# Seconds between event loop lag samples
+LOOP_LAG_SAMPLE_INTERVAL = 0.1
+# Allow starting the sampling profiler at runtime through /metrics/profiler
+PROFILER_ENABLED = getattr(local_settings, "PROFILER_ENABLED", False)
+PROFILER_INTERVAL = 0.005
+
+# Name of a sorting algorithm in bogoapp.algorithms.ALGORITHMS used for new bogos
+SORT_ALGORITHM = getattr(local_settings, "SORT_ALGORITHM", "bogosort")
+
+# The "lehmer" algorithm enumerates only part ENUMERATION_PART of
+# ENUMERATION_PARTS equal parts of all permutations, so that the enumeration
+# can be split across servers, each with its own database.
+ENUMERATION_PART = getattr(local_settings, "ENUMERATION_PART", 0)
+ENUMERATION_PARTS = getattr(local_settings, "ENUMERATION_PARTS", 1)
+# Seconds between saving the enumeration progress
+ENUMERATION_CHECKPOINT_INTERVAL = getattr(local_settings, "ENUMERATION_CHECKPOINT_INTERVAL", 60.0)
 
 RANDOM_SEED = 1
 MINIMUM_SEQUENCE_STOP = 5
 MAXIMUM_SEQUENCE_STOP = 15
 
-DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
 TIMESPEC = "milliseconds"
@@ -0,0 +1,155 @@
+"""
+State shared between Sanic worker processes.
+
+Exactly one worker, the one holding the sorter lock, runs the BogoManager and
+publishes its state into a small memory mapped file, which all workers read
+when serving the feed.
+"""
+import asyncio
+import fcntl
+import logging
+import mmap
+import os
+import struct
+
+
+logger = logging.getLogger("shared")
+
+
+class SorterLock:
+    """
+    Non-blocking exclusive file lock electing the worker that runs the sorter.
+    The lock is released by the operating system if the holding process dies.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_file = None
+
+    @property
+    def acquired(self):
+        return self.lock_file is not None
+
+    def acquire(self):
+        """Return True if this process holds the lock."""
+        if self.acquired:
+            return True
+        lock_file = open(self.path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        logger.info("Process %d acquired the sorter lock", os.getpid())
+        self.lock_file = lock_file
+        return True
+
+    def release(self):
+        if not self.acquired:
+            return
+        fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+        self.lock_file.close()
+        self.lock_file = None
+
+
+class SharedCounter:
+    """
+    Integer in shared memory, incremented and decremented by all workers.
+    Updates are serialized with a file lock.
+    """
+
+    def __init__(self, shared_state, offset):
+        self.shared_state = shared_state
+        self.offset = offset
+
+    def add(self, delta):
+        with self.shared_state.locked():
+            value = max(0, self.shared_state.read_field(self.offset) + delta)
+            self.shared_state.write_field(self.offset, value)
+        return value
+
+    def count(self):
+        return self.shared_state.read_field(self.offset)
+
+
+class SharedState:
+    """
+    Memory mapped file containing the current sorting state.
+    The shuffles, finished, ready and failed fields are written only by the sorter,
+    the spectators field is a SharedCounter written by all workers.
+    """
+    FIELD = struct.Struct("<q")
+    SHUFFLES = 0 * FIELD.size
+    FINISHED = 1 * FIELD.size
+    READY = 2 * FIELD.size
+    SPECTATORS = 3 * FIELD.size
+    FAILED = 4 * FIELD.size
+    SIZE = 5 * FIELD.size
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "a+b")
+        if os.fstat(self.file.fileno()).st_size < self.SIZE:
+            self.file.truncate(self.SIZE)
+        self.memory = mmap.mmap(self.file.fileno(), self.SIZE)
+        self.spectators = SharedCounter(self, self.SPECTATORS)
+
+    @classmethod
+    def reset(cls, path):
+        """Not async. Zero all fields, call once before starting the workers."""
+        with open(path, "wb") as f:
+            f.write(bytes(cls.SIZE))
+
+    def read_field(self, offset):
+        return self.FIELD.unpack_from(self.memory, offset)[0]
+
+    def write_field(self, offset, value):
+        self.FIELD.pack_into(self.memory, offset, value)
+
+    def locked(self):
+        return _FileLock(self.file)
+
+    def publish(self, shuffles, finished):
+        self.write_field(self.SHUFFLES, shuffles)
+        self.write_field(self.FINISHED, int(finished))
+
+    def get_current_state(self):
+        return (self.read_field(self.SHUFFLES),
+                bool(self.read_field(self.FINISHED)))
+
+    def set_ready(self):
+        self.write_field(self.READY, 1)
+
+    def is_ready(self):
+        return bool(self.read_field(self.READY))
+
+    def set_failed(self):
+        """Tell all workers that setting up the database failed and the app cannot become ready."""
+        self.write_field(self.FAILED, 1)
+
+    def has_failed(self):
+        return bool(self.read_field(self.FAILED))
+
+    async def publish_until(self, get_current_state, is_stopped, interval):
+        """Publish the sorter state every interval seconds until is_stopped returns True."""
+        while not is_stopped():
+            self.publish(*get_current_state())
+            await asyncio.sleep(interval)
+        self.publish(*get_current_state())
+
+    def close(self):
+        self.memory.close()
+        self.file.close()
+
+
+class _FileLock:
+
+    def __init__(self, file):
+        self.file = file
+
+    def __enter__(self):
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
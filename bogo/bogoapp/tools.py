@@ -1,9 +1,14 @@
 import itertools
 import datetime
+import functools
 
 from bogoapp import settings
 
 
+EPOCH = datetime.datetime(1970, 1, 1)
+MICROSECONDS = datetime.timedelta(microseconds=1)
+
+
 def datetime_isoformat(date):
     return date.isoformat(timespec=settings.TIMESPEC)
 
@@ -15,7 +20,66 @@ def isoformat_now():
     return datetime_isoformat(datetime.datetime.utcnow())
 
 def datetime_from_isoformat(date_string):
-    return datetime.datetime.strptime(date_string, settings.DATE_FORMAT)
+    return datetime.datetime.fromisoformat(date_string)
+
+
+def epoch_micros_now():
+    """
+    Return the current UTC time as integer microseconds since the epoch.
+    >>> isinstance(epoch_micros_now(), int)
+    True
+    """
+    return epoch_micros_from_datetime(datetime.datetime.utcnow())
+
+def epoch_micros_from_datetime(date):
+    """
+    >>> epoch_micros_from_datetime(datetime.datetime(1970, 1, 1, 0, 0, 1))
+    1000000
+    """
+    return (date - EPOCH) // MICROSECONDS
+
+def datetime_from_epoch_micros(micros):
+    """
+    >>> datetime_from_epoch_micros(1000000)
+    datetime.datetime(1970, 1, 1, 0, 0, 1)
+    """
+    return EPOCH + datetime.timedelta(microseconds=micros)
+
+def epoch_micros_from_isoformat(date_string):
+    """
+    Parse a legacy isoformatted timestamp string into epoch microseconds.
+    >>> epoch_micros_from_isoformat("1970-01-01T00:00:01.500")
+    1500000
+    """
+    return epoch_micros_from_datetime(datetime_from_isoformat(date_string))
+
+@functools.lru_cache(maxsize=1024)
+def isoformat_from_epoch_micros(micros):
+    """
+    Format epoch microseconds as an isoformatted string.
+    None is passed through, since unfinished bogos have no finish timestamp.
+    >>> isoformat_from_epoch_micros(1500000)
+    '1970-01-01T00:00:01.500'
+    >>> isoformat_from_epoch_micros(None) is None
+    True
+    """
+    if micros is None:
+        return None
+    return datetime_isoformat(datetime_from_epoch_micros(micros))
+
+def as_epoch_micros(timestamp):
+    """
+    Return timestamp as epoch microseconds, parsing legacy string timestamps.
+    >>> as_epoch_micros("1970-01-01T00:00:01.500")
+    1500000
+    >>> as_epoch_micros(1500000)
+    1500000
+    >>> as_epoch_micros(None) is None
+    True
+    """
+    if isinstance(timestamp, str):
+        return epoch_micros_from_isoformat(timestamp)
+    return timestamp
 
 
 def is_sorted(seq):
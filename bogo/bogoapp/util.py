@@ -1,14 +1,19 @@
+import os
 import random
-import os.path
 import logging
 
 import sanic
 
 
+from bogoapp import assets
 from bogoapp import bogo_manager
 from bogoapp import db
 from bogoapp import html
+from bogoapp import metrics
+from bogoapp import profiler
+from bogoapp import scheduler
 from bogoapp import settings
+from bogoapp import shared
 from bogoapp import tools
 from bogoapp import ws
 
@@ -18,11 +23,39 @@ def make_sanic(name):
     logger.debug("Create Sanic app %s", name)
     app = sanic.Sanic(name)
     app.config["LOGO"] = settings.LOGO
-    app.static("/static", "./static")
     return app
 
 
-def make_bogo_manager(database_app):
+def make_static_app(sanic_app):
+    logger.debug("Create static asset manifest")
+    manifest = assets.AssetManifest(settings.STATIC_PATH,
+                                    settings.STATIC_BUILD_PATH)
+
+    async def static(request, path):
+        accept_encoding = request.headers.get("Accept-Encoding")
+        resolved = manifest.resolve(path, accept_encoding)
+        if resolved is None:
+            raise sanic.exceptions.NotFound("File not found")
+        file_path, encoding = resolved
+        stat = os.stat(file_path)
+        headers = manifest.headers(path, encoding, stat.st_mtime)
+        if (not manifest.is_hashed(path)
+                and not assets.modified_since(stat.st_mtime, request.headers.get("If-Modified-Since"))):
+            return sanic.response.HTTPResponse(status=304, headers=headers)
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(stat.st_size)
+            return sanic.response.HTTPResponse(headers=headers,
+                                               content_type=manifest.mime_type(path))
+        return await sanic.response.file(file_path,
+                                         mime_type=manifest.mime_type(path),
+                                         headers=headers)
+
+    logger.debug("Attach static route for sanic app %s", sanic_app.name)
+    sanic_app.add_route(static, "/static/<path:path>", methods=["GET", "HEAD"])
+    return manifest
+
+
+def make_bogo_manager(database_app, registry):
     logger.debug("Create BogoManager instance")
     min_stop = settings.MINIMUM_SEQUENCE_STOP
     max_stop = settings.MAXIMUM_SEQUENCE_STOP
@@ -31,34 +64,66 @@ def make_bogo_manager(database_app):
     speed_resolution = getattr(settings, "SPEED_RESOLUTION", 1)
     random_module = random.Random()
     random_module.seed(settings.RANDOM_SEED)
+    adaptive_scheduler = scheduler.AdaptiveScheduler(settings.SCHEDULER_TARGET_LATENCY,
+                                                     settings.SCHEDULER_INITIAL_SLICE,
+                                                     settings.SCHEDULER_MIN_SLICE,
+                                                     settings.SCHEDULER_MAX_SLICE)
+    algorithm_options = {"lehmer": {"part": settings.ENUMERATION_PART,
+                                    "parts": settings.ENUMERATION_PARTS}}
     return bogo_manager.BogoManager(unsorted_lists, speed_resolution,
-                                    database_app, random_module)
+                                    database_app, random_module,
+                                    adaptive_scheduler,
+                                    settings.SORT_ALGORITHM,
+                                    registry,
+                                    algorithm_options,
+                                    settings.ENUMERATION_CHECKPOINT_INTERVAL)
 
 
-def make_database_manager():
+def make_database_manager(registry):
     logger.debug("Create database manager")
     dns = settings.ODBC_DNS
     schema = settings.SQL_SCHEMA_PATH
-    database = db.Database(dns, schema)
-    if not os.path.exists(settings.DATABASE_PATH):
-        logger.debug("No database found")
-        database.init()
-    else:
-        logger.debug("Found existing database")
-    return database
+    return db.Database(dns, schema, registry,
+                       settings.RANDOM_STATE_RECENT,
+                       settings.RANDOM_STATE_KEEP_EVERY)
 
 
-def make_websocket_app(sanic_app, get_current_state):
+def make_metrics():
+    logger.debug("Create metrics registry")
+    return metrics.Registry()
+
+
+def make_profiler():
+    logger.debug("Create sampling profiler")
+    return profiler.SamplingProfiler(settings.PROFILER_INTERVAL)
+
+
+def make_shared_state():
+    logger.debug("Create shared state and sorter lock")
+    return (shared.SharedState(settings.SHARED_STATE_PATH),
+            shared.SorterLock(settings.SORTER_LOCK_PATH))
+
+
+def reset_shared_state():
+    logger.debug("Reset shared state")
+    shared.SharedState.reset(settings.SHARED_STATE_PATH)
+
+
+def make_websocket_app(sanic_app, get_current_state, spectators=None):
     logger.debug("Create websockets manager")
-    ws_manager = ws.WebSocketManager(get_current_state)
+    ws_manager = ws.WebSocketManager(get_current_state, spectators)
     logger.debug("Attach websocket route for sanic app %s", sanic_app.name)
     sanic_app.add_websocket_route(ws_manager.feed, "/feed")
     return ws_manager
 
 
-def make_jinja_app():
+def make_jinja_app(static_url, registry):
     logger.debug("Create template rendering app")
-    return html.JinjaWrapper(settings.TEMPLATE_PATH)
+    return html.JinjaWrapper(settings.TEMPLATE_PATH,
+                             settings.TEMPLATE_BYTECODE_CACHE_PATH,
+                             settings.TEMPLATE_CACHE_SIZE,
+                             template_globals={"static_url": static_url},
+                             registry=registry)
 
 
 
@@ -4,21 +4,52 @@ import websockets
 
 logger = logging.getLogger("WebSocketManager")
 
+
+class SpectatorCounter:
+    """Spectator count of a single process."""
+
+    def __init__(self):
+        self.value = 0
+
+    def add(self, delta):
+        self.value = max(0, self.value + delta)
+        return self.value
+
+    def count(self):
+        return self.value
+
+
 class WebSocketManager:
 
-    def __init__(self, get_current_state):
-        self.spectators = 0
+    def __init__(self, get_current_state, spectators=None):
+        if spectators is None:
+            spectators = SpectatorCounter()
+        self.spectators = spectators
         self.get_current_state = get_current_state
+        self.last_state = None
+        self.last_message = None
+
+    def message(self):
+        """
+        Return the serialized feed state.
+        The serialized state is shared by all spectators until the state changes,
+        so each tick serializes the state once instead of once per spectator.
+        """
+        state = (self.spectators.count(), *self.get_current_state())
+        if state != self.last_state:
+            self.last_state = state
+            self.last_message = json.dumps(state)
+        return self.last_message
 
     async def feed(self, request, ws):
         logger.debug("Open feed")
-        self.spectators += 1
+        self.spectators.add(1)
         try:
             while True:
-                data = json.dumps((self.spectators, *self.get_current_state()))
-                await ws.send(data)
+                await ws.send(self.message())
                 await ws.recv()
         except websockets.exceptions.ConnectionClosed:
-            self.spectators = max(0, self.spectators-1)
+            pass
         finally:
+            self.spectators.add(-1)
             logger.debug("Close feed")
@@ -1,4 +1,5 @@
 import asyncio
+import os
 import sys
 import logging
 
@@ -6,6 +7,7 @@ import sanic
 
 from bogoapp import util
 from bogoapp import bogo
+from bogoapp import settings
 
 
 logging_format = ("%(asctime)s %(process)d-%(levelname)s "
@@ -18,22 +20,47 @@ logger = logging.getLogger(__name__)
 logger.debug("Creating globals")
 
 app = util.make_sanic(__name__)
-database = util.make_database_manager()
-bogo_manager = util.make_bogo_manager(database)
+static_app = util.make_static_app(app)
+metrics_registry = util.make_metrics()
+profiler = util.make_profiler()
+database = util.make_database_manager(metrics_registry)
+bogo_manager = util.make_bogo_manager(database, metrics_registry)
 ws_app = util.make_websocket_app(app, bogo_manager.get_current_state)
-jinja_app = util.make_jinja_app()
+jinja_app = util.make_jinja_app(static_app.url, metrics_registry)
+
+# Set when the database has been initialized and the templates compiled
+app_ready = None
+# Created in each worker process after forking
+shared_state = None
+sorter_lock = None
+loop_lag_sampler = None
 
 logger.debug("Created all globals")
 
 
+async def wait_until_ready():
+    """
+    Wait until the database and templates are ready.
+    Respond with 503 if setting up failed or takes longer than READY_TIMEOUT.
+    """
+    if shared_state.has_failed():
+        raise sanic.exceptions.ServiceUnavailable("The app failed to start.")
+    try:
+        await asyncio.wait_for(app_ready.wait(), settings.READY_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise sanic.exceptions.ServiceUnavailable("The app is starting, try again later.")
+
+
 async def template_response(name, context=None):
+    await wait_until_ready()
     return sanic.response.html(await jinja_app.render(name, context))
 
 
 async def get_bogo_by_id_or_404(bogo_id):
+    await wait_until_ready()
     bogo_row = await database.bogo_by_id(bogo_id)
     if not bogo_row:
-        raise sanic.exceptions.abort(404)
+        raise sanic.exceptions.NotFound("No bogo with id {}".format(bogo_id))
     return bogo.Bogo.from_database_row(bogo_row)
 
 async def adjacent_bogos(bogo_obj):
@@ -45,15 +72,59 @@ def url_for_bogo(bogo_id):
     return app.url_for("view_bogo", bogo_id=bogo_id)
 
 
+@app.route("/health")
+@metrics_registry.timed("routes")
+async def health(request):
+    if shared_state is not None and shared_state.has_failed():
+        return sanic.response.json({"status": "failed"}, status=503)
+    ready = app_ready is not None and app_ready.is_set()
+    return sanic.response.json({"status": "ready" if ready else "starting"})
+
+@app.route("/metrics")
+async def metrics(request):
+    """Metrics of this worker process, only the sorting worker has scheduler metrics."""
+    return sanic.response.json({"pid": os.getpid(),
+                                "sorter": sorter_lock is not None and sorter_lock.acquired,
+                                "spectators": ws_app.spectators.count(),
+                                "scheduler": bogo_manager.scheduler.as_dict(),
+                                "sorting": bogo_manager.algorithm_statistics(),
+                                "profiler": profiler.as_dict(),
+                                "registry": metrics_registry.as_dict()})
+
+def profiler_enabled_or_404():
+    if not settings.PROFILER_ENABLED:
+        raise sanic.exceptions.NotFound("The profiler is disabled")
+
+@app.route("/metrics/profiler/start", methods=["POST"])
+async def start_profiler(request):
+    profiler_enabled_or_404()
+    profiler.start()
+    return sanic.response.json(profiler.as_dict())
+
+@app.route("/metrics/profiler/stop", methods=["POST"])
+async def stop_profiler(request):
+    profiler_enabled_or_404()
+    profiler.stop()
+    return sanic.response.json(profiler.as_dict())
+
+@app.route("/metrics/profiler.txt")
+async def profiler_stacks(request):
+    """Sampled stacks in the collapsed format read by flamegraph.pl."""
+    profiler_enabled_or_404()
+    return sanic.response.text(profiler.collapsed())
+
 @app.route("/")
+@metrics_registry.timed("routes")
 async def index(request):
     return await template_response("index.html")
 
 @app.route("/about")
+@metrics_registry.timed("routes")
 async def about(request):
     return await template_response("about.html")
 
 @app.route("/bogo/<bogo_id:int>")
+@metrics_registry.timed("routes")
 async def view_bogo(request, bogo_id):
     data_url = app.url_for("bogo_json", bogo_id=bogo_id)
     render_context = {"bogo_id":  bogo_id,
@@ -61,6 +132,7 @@ async def view_bogo(request, bogo_id):
     return await template_response('index.html', render_context)
 
 @app.route("/bogo/<bogo_id:int>.json")
+@metrics_registry.timed("routes")
 async def bogo_json(request, bogo_id):
     bogo = await get_bogo_by_id_or_404(bogo_id)
     stats = {
@@ -75,24 +147,118 @@ async def bogo_json(request, bogo_id):
     return sanic.response.json(stats)
 
 
+async def make_ready():
+    logging.info("Precompiling templates")
+    jinja_app.precompile()
+    app_ready.set()
+
+async def wait_for_sorter():
+    """
+    Wait until this worker is elected as the sorter and return True,
+    or return False if setting up the app failed.
+    Until then, prepare the templates as soon as the sorter has set up the database.
+    The lock is retried while waiting, in case the sorter dies.
+    """
+    while True:
+        if shared_state.has_failed():
+            return False
+        if sorter_lock.acquire():
+            # The previous sorter might have failed just before releasing the lock
+            if shared_state.has_failed():
+                sorter_lock.release()
+                return False
+            return True
+        if shared_state.is_ready():
+            if not app_ready.is_set():
+                await make_ready()
+            await asyncio.sleep(settings.SORTER_ELECTION_INTERVAL)
+        else:
+            await asyncio.sleep(settings.SHARED_STATE_INTERVAL)
+
+async def start():
+    """
+    Prepare the database and templates after the server is already accepting
+    connections.
+    If this worker is elected as the sorter, run the BogoManager, which restores
+    the random state, and publish its state to the other workers.
+    Else wait for the sorter to set up the database and try to take over the
+    sorter periodically, in case the sorting worker dies.
+    If setting up the database fails, all workers respond with 503.
+    If sorting fails, the sorter lock is released for another worker to take over.
+    """
+    if not await wait_for_sorter():
+        logging.error("Setting up the app failed in the sorting worker, responding with 503")
+        return
+    logging.info("Setting up database")
+    try:
+        await database.setup()
+    except Exception:
+        logging.exception("Setting up the database failed")
+        shared_state.set_failed()
+        sorter_lock.release()
+        return
+    shared_state.set_ready()
+    if not app_ready.is_set():
+        await make_ready()
+    logging.info("Starting sort")
+    publisher = asyncio.ensure_future(shared_state.publish_until(
+        bogo_manager.get_current_state,
+        lambda: bogo_manager.stopping,
+        settings.SHARED_STATE_INTERVAL))
+    sorting_failed = False
+    try:
+        await bogo_manager.run()
+    except Exception:
+        logging.exception("Sorting failed, releasing the sorter lock")
+        sorting_failed = True
+    finally:
+        bogo_manager.stopping = True
+        await publisher
+    if sorting_failed:
+        sorter_lock.release()
+
+@app.listener("main_process_start")
+async def reset_worker_state(app, loop):
+    """
+    Clear the flags left in the shared state file by a previous run, before
+    any worker maps it, whichever launcher starts the workers.
+    """
+    util.reset_shared_state()
+
 @app.listener("before_server_start")
+async def create_worker_state(app, loop):
+    global app_ready, shared_state, sorter_lock
+    app_ready = asyncio.Event()
+    shared_state, sorter_lock = util.make_shared_state()
+    ws_app.get_current_state = shared_state.get_current_state
+    ws_app.spectators = shared_state.spectators
+
+@app.listener("after_server_start")
 async def begin_sort(app, loop):
-    logging.info("Starting sort")
-    bogo_manager.asyncio_task = asyncio.ensure_future(bogo_manager.run())
+    global loop_lag_sampler
+    loop_lag_sampler = asyncio.ensure_future(
+            metrics_registry.sample_loop_lag(settings.LOOP_LAG_SAMPLE_INTERVAL))
+    bogo_manager.asyncio_task = asyncio.ensure_future(start())
 
 @app.listener("after_server_stop")
 async def abort_sort(app, loop):
     """Graceful abort which saves the state correctly."""
     logging.info("Stopping sort")
     bogo_manager.stopping = True
-    await asyncio.wait([bogo_manager.asyncio_task], loop=loop)
+    if not sorter_lock.acquired:
+        bogo_manager.asyncio_task.cancel()
+    await asyncio.wait([bogo_manager.asyncio_task])
+    sorter_lock.release()
+    shared_state.close()
+    loop_lag_sampler.cancel()
+    profiler.stop()
     logging.info("Sorting stopped")
 
 
 if __name__ == "__main__":
-    if sys.version_info < (3, 6):
-        print("This app requires Python 3.6 or newer.", file=sys.stderr)
+    if sys.version_info < (3, 8):
+        print("This app requires Python 3.8 or newer.", file=sys.stderr)
         sys.exit(1)
-    app.run()
+    app.run(workers=settings.WORKERS)
     logging.info("Exiting app")
 
@@ -5,5 +5,13 @@ settings.register_profile("ci", settings(max_examples=1000))
 settings.register_profile("default", settings(max_examples=100))
 settings.load_profile(os.getenv(u"HYPOTHESIS_PROFILE", "default"))
 
+# Performance tests run under unittest only if this environment variable is set
+PERFORMANCE_TESTS_VARIABLE = "BOGO_PERFORMANCE_TESTS"
+
 LIST_CYCLE_MIN_LENGTH = 1
 LIST_CYCLE_MAX_LENGTH = 100
+
+
+def pytest_configure(config):
+    """Under pytest, performance tests are selected with the performance marker instead."""
+    os.environ.setdefault(PERFORMANCE_TESTS_VARIABLE, "1")
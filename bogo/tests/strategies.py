@@ -3,6 +3,7 @@ import hypothesis
 from unittest.mock import MagicMock
 
 from tests import conftest
+from bogoapp import algorithms
 from bogoapp import settings
 from bogoapp import tools
 
@@ -39,12 +40,27 @@ timedeltas = hypothesis.strategies.timedeltas(
         min_value=datetime.timedelta(**{settings.TIMESPEC: 1}),
         max_value=datetime.timedelta(days=4000*365))
 
+algorithm_names = hypothesis.strategies.sampled_from(
+        sorted(algorithms.ALGORITHMS))
+
+# Sizes of generated workloads in performance tests
+workload_sizes = hypothesis.strategies.integers(
+        min_value=10**4,
+        max_value=10**5)
+
+spectator_counts = hypothesis.strategies.integers(
+        min_value=1,
+        max_value=2000)
+
 async_mocks = hypothesis.strategies.builds(
         AsyncMock)
 
 def isoformatted(dates):
     return tuple(d.isoformat(timespec=settings.TIMESPEC) for d in dates)
 
+def epoch_micros(dates):
+    return tuple(tools.epoch_micros_from_datetime(d) for d in dates)
+
 @hypothesis.strategies.composite
 def _unsorted_list(draw):
     sequence_stop = draw(maximum_sequence_stop)
@@ -64,6 +80,14 @@ def _datetime_and_later(draw):
 
 @hypothesis.strategies.composite
 def _database_bogo_row(draw):
+    return (draw(db_indexes),
+            repr(draw(_unsorted_list())),
+            *epoch_micros(draw(_datetime_and_later())),
+            draw(natural_numbers),
+            draw(algorithm_names))
+
+@hypothesis.strategies.composite
+def _legacy_database_bogo_row(draw):
     return (draw(db_indexes),
             repr(draw(_unsorted_list())),
             *isoformatted(draw(_datetime_and_later())),
@@ -73,15 +97,16 @@ def _database_bogo_row(draw):
 def _database_random_state_row(draw):
     return (draw(db_indexes),
             repr(draw(hypothesis.strategies.randoms()).getstate()),
-            draw(datetimes),
+            *epoch_micros((draw(datetimes), )),
             draw(db_indexes))
 
 @hypothesis.strategies.composite
 def _bogo_init_args(draw):
     return (draw(db_indexes),
             draw(_unsorted_list()),
-            *isoformatted(draw(_datetime_and_later())),
-            draw(natural_numbers))
+            *epoch_micros(draw(_datetime_and_later())),
+            draw(natural_numbers),
+            draw(algorithm_names))
 
 @hypothesis.strategies.composite
 def _bogo_manager_init_args(draw):
@@ -93,6 +118,7 @@ def _bogo_manager_init_args(draw):
 
 unsorted_list_cycles = _unsorted_list_cycle()
 database_bogo_rows = _database_bogo_row()
+legacy_database_bogo_rows = _legacy_database_bogo_row()
 database_random_state_rows = _database_random_state_row()
 bogo_init_arg_tuples = _bogo_init_args()
 bogo_manager_init_arg_tuples = _bogo_manager_init_args()
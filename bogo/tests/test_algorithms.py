@@ -0,0 +1,117 @@
+import math
+import random
+import unittest
+
+import hypothesis
+
+from . import strategies
+
+from bogoapp import algorithms
+from bogoapp import tools
+
+
+class TestAlgorithms(unittest.TestCase):
+
+    @hypothesis.settings(deadline=None)
+    @hypothesis.given(name=strategies.algorithm_names,
+                      sequence=hypothesis.strategies.permutations(list(range(5))),
+                      seed=hypothesis.strategies.integers())
+    def test_sorts_permutation(self, name, sequence, seed):
+        algorithm = algorithms.make_algorithm(name, random.Random(seed))
+        sequence = list(sequence)
+        algorithm.reset(sequence)
+        steps = 0
+        while not tools.is_sorted(sequence):
+            algorithm.step(sequence)
+            steps += 1
+            self.assertLess(steps, 10**5, "{} did not sort {} in time.".format(name, sequence))
+        self.assertListEqual(sequence, list(range(5)))
+
+    @hypothesis.given(name=hypothesis.strategies.sampled_from(["permutations", "deterministic"]),
+                      sequence=hypothesis.strategies.permutations(list(range(6))))
+    def test_enumeration_expected_steps_are_exact(self, name, sequence):
+        algorithm = algorithms.make_algorithm(name, None)
+        sequence = list(sequence)
+        algorithm.reset(sequence)
+        expected_steps = algorithm.expected_steps(sequence)
+        steps = 0
+        while not tools.is_sorted(sequence):
+            algorithm.step(sequence)
+            steps += 1
+        self.assertEqual(steps, expected_steps)
+
+    def test_enumerations_visit_all_permutations(self):
+        for name in ("permutations", "deterministic", "lehmer"):
+            sequence = list(range(5, 0, -1))
+            algorithm = algorithms.make_algorithm(name, None)
+            algorithm.reset(sequence)
+            seen = set()
+            for _ in range(math.factorial(5)):
+                seen.add(tuple(sequence))
+                algorithm.step(sequence)
+            self.assertEqual(len(seen), math.factorial(5),
+                             "{} should visit every permutation once per cycle.".format(name))
+
+    @hypothesis.given(sequence=hypothesis.strategies.permutations(list(range(6))),
+                      parts=hypothesis.strategies.integers(min_value=1, max_value=10),
+                      data=hypothesis.strategies.data())
+    def test_lehmer_enumeration_parts(self, sequence, parts, data):
+        part = data.draw(hypothesis.strategies.integers(min_value=0, max_value=parts - 1))
+        start, stop = algorithms.enumeration_range(len(sequence), part, parts)
+        algorithm = algorithms.make_algorithm("lehmer", None, part=part, parts=parts)
+        sequence = list(sequence)
+        algorithm.reset(sequence)
+        steps = data.draw(hypothesis.strategies.integers(min_value=0, max_value=stop - start))
+        for _ in range(steps):
+            algorithm.step(sequence)
+
+        resumed_sequence = list(sequence)
+        resumed = algorithms.make_algorithm("lehmer", None, part=part, parts=parts)
+        resumed.reset(resumed_sequence, algorithm.checkpoint())
+        self.assertListEqual(resumed_sequence, sequence,
+                             "Resuming from a checkpoint should not change the sequence.")
+        self.assertEqual(resumed.sorted_index, algorithm.sorted_index)
+        expected_steps = resumed.expected_steps(resumed_sequence)
+        steps_before = resumed.checkpoint().position
+        while not resumed.exhausted():
+            if tools.is_sorted(resumed_sequence):
+                break
+            resumed.step(resumed_sequence)
+        position = resumed.checkpoint().position
+        self.assertEqual(position - steps_before, expected_steps)
+        if start <= algorithm.sorted_index < stop and position <= algorithm.sorted_index:
+            self.assertTrue(tools.is_sorted(resumed_sequence))
+            self.assertEqual(position, algorithm.sorted_index,
+                             "The enumeration should find the sorted permutation at its Lehmer index.")
+        else:
+            self.assertEqual(position, stop - 1)
+
+    @hypothesis.given(sequence=hypothesis.strategies.permutations(list(range(5))),
+                      steps=hypothesis.strategies.integers(min_value=0, max_value=119),
+                      stale_steps=hypothesis.strategies.integers(min_value=0, max_value=119))
+    def test_lehmer_enumeration_resumes_stale_sequence(self, sequence, steps, stale_steps):
+        base = list(sequence)
+        algorithm = algorithms.make_algorithm("lehmer", None)
+        sequence = list(base)
+        algorithm.reset(sequence)
+        for _ in range(steps):
+            algorithm.step(sequence)
+        checkpoint = algorithm.checkpoint()
+        # The sequence saved before or after the checkpoint
+        stale_sequence = [base[i] for i in algorithms.permutation_from_index(5, stale_steps)]
+
+        resumed = algorithms.make_algorithm("lehmer", None)
+        resumed.reset(stale_sequence, checkpoint)
+        self.assertListEqual(stale_sequence, sequence,
+                             "Resuming should rebuild the sequence from the checkpoint.")
+        self.assertEqual(resumed.checkpoint(), checkpoint)
+        with self.assertRaises(ValueError):
+            resumed.reset(stale_sequence + [5], checkpoint)
+
+    def test_unknown_algorithm(self):
+        with self.assertRaises(ValueError):
+            algorithms.make_algorithm("quicksort", None)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,140 @@
+import gzip
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import unittest
+
+from bogoapp import assets
+from bogoapp import settings
+
+
+class TestAssets(unittest.TestCase):
+
+    def setUp(self):
+        self.static_dir = tempfile.TemporaryDirectory()
+        self.static_path = self.static_dir.name
+        self.build_path = os.path.join(self.static_path, "dist")
+        self.sources = {"js/main.js": b"console.log('bogo');\n" * 100,
+                        "css/main.css": b"body { color: red; }\n",
+                        "fonts/font.woff": b"\x00\x01\x02",
+                        "css/fonts.css": b"@font-face { src: url('../fonts/font.woff?#iefix'); }\n"
+                                         b"/*# sourceMappingURL=fonts.css.map */",
+                        "css/fonts.css.map": b"{}",
+                        "templates/index.html": b"<p>not an asset</p>"}
+        for relative_path, data in self.sources.items():
+            path = os.path.join(self.static_path, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        self.built = assets.build(self.static_path, self.build_path, skip_paths=("templates", ))
+        self.manifest = assets.AssetManifest(self.static_path, self.build_path)
+
+    def tearDown(self):
+        self.static_dir.cleanup()
+
+    def test_build_writes_hashed_and_compressed_files(self):
+        self.assertSetEqual(set(self.built), {"js/main.js", "css/main.css", "css/fonts.css",
+                                              "css/fonts.css.map", "fonts/font.woff"})
+        self.assertDictEqual(self.manifest.manifest, self.built)
+        for relative_path, hashed_path in self.built.items():
+            if relative_path == "css/fonts.css":
+                continue
+            data = self.sources[relative_path]
+            self.assertIn(assets.content_hash(data), hashed_path)
+            path = os.path.join(self.build_path, hashed_path)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), data)
+            if relative_path.endswith(assets.COMPRESSIBLE_EXTENSIONS):
+                with open(path + ".gz", "rb") as f:
+                    self.assertEqual(gzip.decompress(f.read()), data)
+            else:
+                self.assertFalse(os.path.exists(path + ".gz"),
+                                 "Binary assets should not be precompressed.")
+
+    def test_build_rewrites_references(self):
+        with open(os.path.join(self.build_path, self.built["css/fonts.css"]), "rb") as f:
+            data = f.read()
+        self.assertIn(assets.content_hash(data), self.built["css/fonts.css"],
+                      "The hash should be computed from the rewritten content.")
+        self.assertEqual(
+                data.decode("utf-8"),
+                "@font-face {{ src: url('../{}?#iefix'); }}\n/*# sourceMappingURL={} */"
+                .format(self.built["fonts/font.woff"],
+                        posixpath.basename(self.built["css/fonts.css.map"])))
+
+    def test_build_is_reproducible(self):
+        self.assertDictEqual(
+                assets.build(self.static_path, self.build_path, skip_paths=("templates", )),
+                self.built)
+
+    def test_url_uses_hashed_path(self):
+        self.assertEqual(self.manifest.url("js/main.js"),
+                         "/static/dist/" + self.built["js/main.js"])
+        self.assertEqual(self.manifest.url("js/missing.js"), "/static/js/missing.js")
+
+    def test_resolve_picks_precompressed_variant(self):
+        relative_url = self.manifest.url("js/main.js")[len("/static/"):]
+        path, encoding = self.manifest.resolve(relative_url, "gzip, deflate")
+        self.assertEqual(encoding, "gzip")
+        self.assertTrue(path.endswith(".js.gz"))
+        headers = self.manifest.headers(relative_url, encoding)
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Cache-Control"], assets.IMMUTABLE_CACHE_CONTROL)
+
+        path, encoding = self.manifest.resolve(relative_url, "gzip;q=0")
+        self.assertIsNone(encoding)
+        self.assertTrue(path.endswith(".js"))
+
+    def test_resolve_unhashed_and_outside_paths(self):
+        path, encoding = self.manifest.resolve("js/main.js", "gzip")
+        self.assertIsNone(encoding, "Unhashed assets should be served as is.")
+        self.assertNotIn("Cache-Control", self.manifest.headers("js/main.js", encoding))
+        modified = os.stat(path).st_mtime
+        headers = self.manifest.headers("js/main.js", encoding, modified)
+        self.assertEqual(headers["Last-Modified"], assets.http_date(modified))
+        self.assertFalse(assets.modified_since(modified, headers["Last-Modified"]),
+                         "Unhashed assets should be revalidated with their modification time.")
+        self.assertIsNone(self.manifest.resolve("../outside.js"))
+        self.assertIsNone(self.manifest.resolve("js/missing.js"))
+
+
+class TestBuildStaticAssets(unittest.TestCase):
+
+    def setUp(self):
+        self.static_dir = tempfile.TemporaryDirectory()
+        self.static_path = os.path.join(self.static_dir.name, "static")
+        shutil.copytree(settings.STATIC_PATH, self.static_path,
+                        ignore=shutil.ignore_patterns("dist"))
+        self.build_path = os.path.join(self.static_path, "dist")
+        self.built = assets.build(self.static_path, self.build_path,
+                                  skip_paths=settings.STATIC_BUILD_SKIP)
+        self.manifest = assets.AssetManifest(self.static_path, self.build_path)
+
+    def tearDown(self):
+        self.static_dir.cleanup()
+
+    def test_built_references_resolve(self):
+        references = 0
+        for relative_path, hashed_path in self.built.items():
+            patterns = assets.REFERENCE_PATTERNS.get(os.path.splitext(relative_path)[1], ())
+            with open(os.path.join(self.build_path, hashed_path), "rb") as f:
+                data = f.read()
+            for pattern in patterns:
+                for match in pattern.finditer(data):
+                    reference = match.group(2).decode("utf-8")
+                    if reference.startswith("data:"):
+                        continue
+                    path = re.split(r"[?#]", reference)[0]
+                    url_path = posixpath.normpath(posixpath.join(
+                            "dist", posixpath.dirname(hashed_path), path))
+                    self.assertIsNotNone(self.manifest.resolve(url_path),
+                                         "{} references {}, which is not served."
+                                         .format(relative_path, reference))
+                    references += 1
+        self.assertGreater(references, 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
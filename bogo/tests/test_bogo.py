@@ -6,6 +6,7 @@ from . import strategies
 from . import conftest
 
 from bogoapp import bogo
+from bogoapp import settings
 from bogoapp import tools
 
 
@@ -27,6 +28,19 @@ class TestDateHelpers(unittest.TestCase):
                     datetime.timedelta(milliseconds=1),
                     "The date helpers should return datetimes which are now.")
 
+    @hypothesis.given(date=strategies.datetimes)
+    def test_epoch_micros_round_trip(self, date):
+        micros = tools.epoch_micros_from_datetime(date)
+        self.assertIsInstance(micros, int)
+        self.assertEqual(tools.datetime_from_epoch_micros(micros), date)
+        isoformatted = date.isoformat(timespec=settings.TIMESPEC)
+        self.assertEqual(tools.isoformat_from_epoch_micros(micros), isoformatted)
+        self.assertEqual(tools.epoch_micros_from_isoformat(isoformatted),
+                         micros - micros % 1000,
+                         "Parsing an isoformatted timestamp should give the "
+                         "epoch microseconds truncated to the formatting "
+                         "timespec.")
+
 
 class TestBogo(unittest.TestCase):
 
@@ -39,10 +53,22 @@ class TestBogo(unittest.TestCase):
         self.assertEqual(repr(bogo_obj.sequence), row[1])
         self.assertEqual(bogo_obj.created, row[2])
         self.assertEqual(bogo_obj.finished, row[3])
-        self.assertLess(tools.datetime_from_isoformat(bogo_obj.created),
-                        tools.datetime_from_isoformat(bogo_obj.finished))
+        self.assertLess(bogo_obj.created, bogo_obj.finished)
         self.assertEqual(bogo_obj.shuffles, row[4])
         self.assertGreaterEqual(bogo_obj.shuffles, 0)
+        self.assertEqual(bogo_obj.algorithm, row[5])
+
+    @hypothesis.given(row=strategies.legacy_database_bogo_rows)
+    def test_build_bogo_from_legacy_database_row(self, row):
+        bogo_obj = bogo.Bogo.from_database_row(row)
+
+        self.assertEqual(bogo_obj.created, tools.epoch_micros_from_isoformat(row[2]))
+        self.assertEqual(bogo_obj.finished, tools.epoch_micros_from_isoformat(row[3]))
+        self.assertLessEqual(bogo_obj.created, bogo_obj.finished)
+        self.assertEqual(bogo_obj.as_dict()["created"], row[2])
+        self.assertEqual(bogo_obj.as_dict()["finished"], row[3])
+        self.assertEqual(bogo_obj.algorithm, "bogosort",
+                         "Bogos saved before algorithms were pluggable were bogosorted.")
 
     @hypothesis.given(init_args=strategies.bogo_init_arg_tuples)
     def test_bogo_as_database_row(self, init_args):
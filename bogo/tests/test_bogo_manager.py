@@ -1,12 +1,14 @@
 import ast
 import asyncio
 import unittest
+import unittest.mock
 
 import hypothesis
 import uvloop
 
 from . import strategies
 
+from bogoapp import algorithms
 from bogoapp.bogo import Bogo
 from bogoapp.bogo_manager import BogoManager, BogoError
 
@@ -114,6 +116,98 @@ class TestBogoManager(unittest.TestCase):
                          "of the random module from the retrieved random state "
                          "database row.")
 
+    @hypothesis.given(init_args=strategies.bogo_manager_init_arg_tuples,
+                      random_row=strategies.database_random_state_rows,
+                      random_state_at_mock=strategies.async_mocks)
+    def test_restore_random_state(self, init_args, random_row, random_state_at_mock):
+        """
+        Restoring the random state at a bogo sets the random module state from the nearest saved state.
+        """
+        self.bogo_manager = BogoManager(*init_args)
+        random_state_at_mock.mock.return_value = random_row
+        self.bogo_manager.database.random_state_at = random_state_at_mock
+        restored_bogo_id = self.loop.run_until_complete(
+                self.bogo_manager.restore_random_state(random_row[3] + 1))
+        self.assertEqual(restored_bogo_id, random_row[3])
+        self.assertEqual(self.bogo_manager.random.getstate(), ast.literal_eval(random_row[1]))
+        random_state_at_mock.mock.assert_called_once_with(random_row[3] + 1)
+
+        random_state_at_mock.mock.return_value = None
+        self.assertIsNone(self.loop.run_until_complete(
+                self.bogo_manager.restore_random_state(1)))
+
+    @hypothesis.given(init_args=strategies.bogo_manager_init_arg_tuples,
+                      sequence=hypothesis.strategies.permutations(list(range(4))),
+                      algorithm=strategies.algorithm_names,
+                      save_state_mock=strategies.async_mocks)
+    def test_sort_current_until_done(self, init_args, sequence, algorithm, save_state_mock):
+        """
+        Sorting the current bogo shuffles it in time slices until it is sorted and then saves the state.
+        """
+        hypothesis.assume(sequence != sorted(sequence))
+        self.bogo_manager = BogoManager(*init_args)
+        self.bogo_manager.database.save_state = save_state_mock
+        self.bogo_manager.current_bogo = Bogo(sequence=list(sequence), created=0,
+                                              algorithm=algorithm)
+        self._run_in_loop(self.bogo_manager.sort_current_until_done)
+        self.assertEqual(self.bogo_manager.current_bogo.sequence, sorted(sequence))
+        self.assertIsNotNone(self.bogo_manager.current_bogo.finished)
+        self.assertGreaterEqual(self.bogo_manager.scheduler.slices.count, 1)
+        save_state_mock.mock.assert_called_once()
+        statistics = self.bogo_manager.algorithm_statistics()
+        self.assertEqual(statistics["algorithms"][algorithm]["steps"],
+                         self.bogo_manager.current_bogo.shuffles)
+        self.assertEqual(statistics["algorithms"][algorithm]["finished_bogos"], 1)
+        self.assertEqual(statistics["current"]["algorithm"], algorithm)
+        if algorithm in ("permutations", "deterministic"):
+            self.assertEqual(statistics["current"]["expected_steps"],
+                             self.bogo_manager.current_bogo.shuffles,
+                             "The expected steps of enumerations should be exact.")
+
+    @hypothesis.given(init_args=strategies.bogo_manager_init_arg_tuples,
+                      position=hypothesis.strategies.integers(min_value=0, max_value=23),
+                      saved_position=hypothesis.strategies.integers(min_value=0, max_value=23),
+                      save_state_mock=strategies.async_mocks,
+                      enumeration_checkpoint_mock=strategies.async_mocks,
+                      save_enumeration_checkpoint_mock=strategies.async_mocks)
+    def test_resume_enumeration(self, init_args, position, saved_position, save_state_mock,
+                                enumeration_checkpoint_mock, save_enumeration_checkpoint_mock):
+        """
+        Enumerating a bogo resumes from its checkpoint, even if the saved bogo
+        does not match it, and stops at the end of its part of all permutations.
+        """
+        self.bogo_manager = BogoManager(*init_args, algorithm="lehmer",
+                                        algorithm_options={"lehmer": {"part": 0, "parts": 2}})
+        self.bogo_manager.database.save_state = save_state_mock
+        self.bogo_manager.database.enumeration_checkpoint = enumeration_checkpoint_mock
+        self.bogo_manager.database.save_enumeration_checkpoint = save_enumeration_checkpoint_mock
+        enumeration_checkpoint_mock.mock.return_value = algorithms.Checkpoint([4, 3, 2, 1], 0, position, 24)
+        # The reversed sequence permuted to a position saved before or after the checkpoint
+        sequence = [4 - i for i in algorithms.permutation_from_index(4, saved_position)]
+        self.bogo_manager.current_bogo = Bogo(1, sequence=sequence, created=0, algorithm="lehmer")
+        self._run_in_loop(self.bogo_manager.sort_current_until_done)
+        enumeration_checkpoint_mock.mock.assert_called_once_with(1)
+        save_enumeration_checkpoint_mock.mock.assert_not_called()
+        self.assertEqual(self.bogo_manager.current_bogo.sequence, [1, 2, 3, 4])
+        self.assertEqual(self.bogo_manager.current_bogo.shuffles, 23)
+        save_state_mock.mock.assert_called_once_with(self.bogo_manager.current_bogo,
+                                                     unittest.mock.ANY, unittest.mock.ANY,
+                                                     algorithms.Checkpoint([4, 3, 2, 1], 0, 23, 24))
+
+        self.bogo_manager.current_bogo = Bogo(2, sequence=[4, 3, 2, 1], created=0, algorithm="lehmer")
+        enumeration_checkpoint_mock.mock.return_value = None
+        self._run_in_loop(self.bogo_manager.sort_current_until_done)
+        save_enumeration_checkpoint_mock.mock.assert_called_once_with(
+                2, algorithms.Checkpoint([4, 3, 2, 1], 0, 0, 12), unittest.mock.ANY)
+        self.assertFalse(self.bogo_manager.current_bogo.is_finished(),
+                         "The sorted permutation is not in the first half of all permutations.")
+        self.assertEqual(self.bogo_manager.algorithm_statistics()["current"]["enumeration"]["position"], 11)
+
+    @hypothesis.given(init_args=strategies.bogo_manager_init_arg_tuples)
+    def test_unknown_algorithm(self, init_args):
+        with self.assertRaises(BogoError):
+            BogoManager(*init_args, algorithm="quicksort")
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
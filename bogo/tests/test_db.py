@@ -0,0 +1,137 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import unittest
+import unittest.mock
+
+import hypothesis
+
+from bogoapp import db
+
+
+SCHEMA_PATH = os.path.join(os.path.dirname(db.__file__), "schema.sql")
+
+OLD_SCHEMA = """
+create table bogos (
+  id       integer    primary key autoincrement,
+  sequence text       not null,
+  created  timestamp  not null,
+  finished timestamp,
+  shuffles integer
+);
+create table random (
+  id       integer    primary key,
+  state    text,
+  saved    timestamp,
+  bogo     integer,
+  foreign key(bogo) references bogos(id)
+);
+insert into bogos values(1, '[2, 1]', '2017-01-01T00:00:00.123', '2017-01-01T00:00:01.000', 2);
+insert into bogos values(2, '[3, 2, 1]', '2017-01-01T00:00:01.000', null, 10);
+insert into random values(1, 'state 1', '2017-01-01T00:00:01.000', 1);
+insert into random values(2, 'state 2', '2017-01-01T00:00:02.000', 2);
+insert into random values(3, null, null, null);
+"""
+
+
+class TestDatabaseSetup(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.database_path = os.path.join(self.tmp_dir.name, "bogo.db")
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        self.tmp_dir.cleanup()
+
+    def _setup(self, recent, every):
+        database = db.Database("Database=" + self.database_path, SCHEMA_PATH,
+                               recent_random_states=recent,
+                               keep_every_random_state=every)
+        self.loop.run_until_complete(database.setup())
+        return sqlite3.connect(self.database_path)
+
+    def test_migrate_old_database(self):
+        connection = sqlite3.connect(self.database_path)
+        connection.executescript(OLD_SCHEMA)
+        connection.close()
+
+        connection = self._setup(10, 100)
+        self.assertListEqual(
+                connection.execute("select created, finished from bogos order by id").fetchall(),
+                [(1483228800123000, 1483228801000000), (1483228801000000, None)])
+        self.assertListEqual(
+                connection.execute("select state, saved, bogo from random order by bogo").fetchall(),
+                [("state 1", 1483228801000000, 1), ("state 2", 1483228802000000, 2)],
+                "Migrating the random state ring should keep all saved states.")
+        self.assertListEqual(
+                connection.execute("select algorithm from bogos order by id").fetchall(),
+                [("bogosort", ), ("bogosort", )])
+        self.assertListEqual(connection.execute("select * from enumeration").fetchall(), [],
+                             "Migrating should create the enumeration checkpoint table.")
+        connection.close()
+
+        connection = self._setup(10, 100)
+        self.assertEqual(connection.execute("select count(*) from random").fetchone()[0], 2,
+                         "Migrating twice should not change the database.")
+
+    def test_migrate_enumeration_checkpoints_without_base(self):
+        connection = sqlite3.connect(self.database_path)
+        connection.executescript(OLD_SCHEMA)
+        connection.execute("create table enumeration (bogo integer primary key, "
+                           "position integer, stop integer, saved integer)")
+        connection.execute("insert into enumeration values (2, 3, 6, 0)")
+        connection.commit()
+        connection.close()
+
+        connection = self._setup(10, 100)
+        columns = [row[1] for row in connection.execute("pragma table_info(enumeration)")]
+        self.assertListEqual(columns, ["bogo", "base", "start", "position", "stop", "saved"])
+        self.assertListEqual(connection.execute("select * from enumeration").fetchall(), [],
+                             "Checkpoints without a starting sequence cannot be resumed.")
+        connection.close()
+
+    def test_failed_random_history_migration_keeps_old_states(self):
+        connection = sqlite3.connect(self.database_path)
+        connection.executescript(OLD_SCHEMA)
+        connection.close()
+        broken_schema_path = os.path.join(self.tmp_dir.name, "random_schema.sql")
+        with open(db.RANDOM_SCHEMA_PATH) as f, open(broken_schema_path, "w") as broken:
+            broken.write(f.read() + "\ninsert into missing_table values (1);\n")
+
+        database = db.Database("Database=" + self.database_path, SCHEMA_PATH)
+        with unittest.mock.patch.object(db, "RANDOM_SCHEMA_PATH", broken_schema_path):
+            with self.assertRaises(sqlite3.OperationalError):
+                database.migrate_random_history()
+        connection = sqlite3.connect(self.database_path)
+        self.assertListEqual(
+                connection.execute("select name from sqlite_master where type='table' "
+                                   "and name like 'random%' order by name").fetchall(),
+                [("random", )])
+        self.assertEqual(connection.execute("select count(*) from random").fetchone()[0], 3,
+                         "A failed migration should not lose the saved random states.")
+        connection.close()
+
+    @hypothesis.settings(deadline=None, max_examples=20)
+    @hypothesis.given(recent=hypothesis.strategies.integers(min_value=1, max_value=20),
+                      every=hypothesis.strategies.integers(min_value=1, max_value=20),
+                      bogo_count=hypothesis.strategies.integers(min_value=1, max_value=100))
+    def test_random_state_retention(self, recent, every, bogo_count):
+        if os.path.exists(self.database_path):
+            os.remove(self.database_path)
+        connection = self._setup(recent, every)
+        for bogo_id in range(1, bogo_count + 1):
+            connection.execute("insert into random (state, saved, bogo) values ('', 0, ?)",
+                               (bogo_id, ))
+        kept = [row[0] for row in connection.execute("select bogo from random order by bogo")]
+        connection.close()
+        expected = [bogo_id for bogo_id in range(1, bogo_count + 1)
+                    if bogo_id > bogo_count - recent or bogo_id % every == 0]
+        self.assertListEqual(kept, expected)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
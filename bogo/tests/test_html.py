@@ -0,0 +1,63 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+import hypothesis
+
+from . import strategies
+
+from bogoapp.html import JinjaWrapper
+
+
+class TestJinjaWrapper(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.template_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        for name, source in (("static.html", "<p>static</p>"),
+                             ("bogo.html", "<p>{{ bogo_id }} {{ data_url }}</p>")):
+            with open(os.path.join(self.template_dir.name, name), "w") as f:
+                f.write(source)
+        self.jinja_app = JinjaWrapper(self.template_dir.name, self.cache_dir.name, cache_size=4)
+        self.jinja_app.precompile()
+
+    def tearDown(self):
+        self.loop.close()
+        self.template_dir.cleanup()
+        self.cache_dir.cleanup()
+
+    def _render(self, name, context=None):
+        return self.loop.run_until_complete(self.jinja_app.render(name, context))
+
+    def test_precompile_writes_bytecode_cache(self):
+        self.assertSetEqual(set(self.jinja_app.templates), {"static.html", "bogo.html"})
+        self.assertEqual(len(os.listdir(self.cache_dir.name)), 2,
+                         "Precompiling should write one bytecode cache file per template.")
+
+    def test_static_page_is_rendered_once(self):
+        first = self._render("static.html")
+        self.assertEqual(first, b"<p>static</p>")
+        self.assertIs(self._render("static.html"), first,
+                      "A template rendered without context should be served from the cache.")
+        self.assertDictEqual(dict(self.jinja_app.registry.counters["template_cache"]),
+                             {"hits": 1, "misses": 1})
+        self.assertEqual(self.jinja_app.registry.histogram("templates", "static.html").count, 2)
+
+    @hypothesis.given(bogo_ids=hypothesis.strategies.lists(strategies.db_indexes,
+                                                           min_size=1,
+                                                           max_size=20))
+    def test_parameterized_cache_is_bounded(self, bogo_ids):
+        for bogo_id in bogo_ids:
+            context = {"bogo_id": bogo_id, "data_url": "/bogo/{}.json".format(bogo_id)}
+            rendered = self._render("bogo.html", context)
+            self.assertEqual(rendered,
+                             "<p>{} /bogo/{}.json</p>".format(bogo_id, bogo_id).encode("utf-8"))
+            self.assertIs(self._render("bogo.html", dict(context)), rendered)
+            self.assertLessEqual(len(self.jinja_app.cache), self.jinja_app.cache_size)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
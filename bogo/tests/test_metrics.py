@@ -0,0 +1,100 @@
+import asyncio
+import time
+import unittest
+
+import hypothesis
+
+from bogoapp import metrics
+from bogoapp import profiler
+
+
+durations = hypothesis.strategies.floats(min_value=0, max_value=10)
+
+
+class TestHistogram(unittest.TestCase):
+
+    @hypothesis.given(values=hypothesis.strategies.lists(durations, min_size=1))
+    def test_quantiles_are_ordered_upper_bounds(self, values):
+        histogram = metrics.Histogram()
+        for value in values:
+            histogram.observe(value)
+        self.assertEqual(histogram.count, len(values))
+        self.assertEqual(sum(histogram.counts), len(values))
+        p50, p99 = histogram.quantile(0.5), histogram.quantile(0.99)
+        self.assertLessEqual(p50, p99)
+        self.assertGreaterEqual(p99, sorted(values)[int(0.99 * len(values)) - 1],
+                                "The quantile should be an upper bound of the observed values.")
+
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = metrics.Registry()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_timed_coroutine_function(self):
+        @self.registry.timed("routes")
+        async def index(request):
+            return request
+
+        self.assertEqual(index.__name__, "index",
+                         "Route handlers are looked up by name and should keep it when timed.")
+        for i in range(3):
+            self.assertEqual(self.loop.run_until_complete(index(i)), i)
+        self.assertEqual(self.registry.histogram("routes", "index").count, 3)
+
+    def test_timer_records_failures(self):
+        with self.assertRaises(ZeroDivisionError):
+            with self.registry.timer("sql", "select 1/0"):
+                1/0
+        self.assertEqual(self.registry.histogram("sql", "select 1/0").count, 1)
+
+    def test_as_dict(self):
+        self.registry.observe("templates", "index.html", 0.001)
+        self.registry.increment("template_cache", "hits")
+        self.registry.increment("template_cache", "hits")
+        exported = self.registry.as_dict()
+        self.assertEqual(exported["templates"]["index.html"]["count"], 1)
+        self.assertDictEqual(exported["template_cache"], {"hits": 2})
+
+    def test_sample_loop_lag(self):
+        async def sample_for_a_while():
+            sampler = asyncio.ensure_future(self.registry.sample_loop_lag(0.001))
+            for _ in range(5):
+                await asyncio.sleep(0.002)
+                time.sleep(0.005)
+            sampler.cancel()
+
+        self.loop.run_until_complete(sample_for_a_while())
+        lag = self.registry.histogram("loop", "lag")
+        self.assertGreater(lag.count, 0)
+        self.assertGreaterEqual(lag.max, 0.001,
+                                "Blocking the event loop should be observed as loop lag.")
+
+
+class TestSamplingProfiler(unittest.TestCase):
+
+    def test_samples_busy_thread(self):
+        sampling_profiler = profiler.SamplingProfiler(interval=0.001)
+        sampling_profiler.start()
+        self.assertTrue(sampling_profiler.running)
+        end = time.perf_counter() + 0.1
+        while time.perf_counter() < end:
+            pass
+        sampling_profiler.stop()
+        self.assertFalse(sampling_profiler.running)
+        self.assertGreater(sampling_profiler.as_dict()["samples"], 0)
+        lines = sampling_profiler.collapsed().splitlines()
+        self.assertTrue(any("test_samples_busy_thread" in line for line in lines))
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            self.assertGreater(int(count), 0)
+            self.assertIn(";", stack)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
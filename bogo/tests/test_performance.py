@@ -0,0 +1,256 @@
+"""
+Performance regression tests, which check complexity bounds on large generated workloads.
+Excluded by default, run them with:
+
+    python -m pytest -m performance
+
+or with unittest:
+
+    BOGO_PERFORMANCE_TESTS=1 python -m unittest tests.test_performance
+"""
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import tempfile
+import timeit
+import unittest
+import unittest.mock
+
+import hypothesis
+
+from . import conftest
+from . import strategies
+
+from bogoapp import algorithms
+from bogoapp import db
+from bogoapp import tools
+from bogoapp import ws
+from bogoapp.bogo import Bogo
+
+try:
+    import pytest
+except ImportError:
+    pytest = None
+
+
+def performance(test_case):
+    """Mark a test case as a performance test, which is excluded by default."""
+    test_case = unittest.skipUnless(
+            os.getenv(conftest.PERFORMANCE_TESTS_VARIABLE),
+            "Performance tests run with python -m pytest -m performance or with {}=1"
+            .format(conftest.PERFORMANCE_TESTS_VARIABLE))(test_case)
+    if pytest is not None:
+        test_case = pytest.mark.performance(test_case)
+    return test_case
+
+
+# Ratio of input sizes when measuring how the running time grows
+SIZE_RATIO = 8
+# Allowed error of the measured growth exponent
+EXPONENT_SLACK = 0.5
+# Upper bound of SQL commands issued by one Database.save_state
+SAVE_STATE_MAX_QUERIES = 5
+
+SCHEMA_PATH = os.path.join(os.path.dirname(db.__file__), "schema.sql")
+
+performance_settings = hypothesis.settings(deadline=None, max_examples=10)
+
+
+def best_time(f, repeat=5, number=3):
+    """Return the best time in seconds of calling f."""
+    return min(timeit.repeat(f, repeat=repeat, number=number)) / number
+
+
+def timing_diagnostics(timings):
+    return "\n".join("  n={:>9}: {:.6f} s".format(n, seconds) for n, seconds in timings)
+
+
+class PerformanceTestCase(unittest.TestCase):
+
+    def assertGrowthAtMost(self, f, make_input, size, exponent):
+        """
+        Assert that the running time of f grows at most as size**exponent by
+        timing f on inputs of size and SIZE_RATIO times size.
+        """
+        timings = []
+        for n in (size, size * SIZE_RATIO):
+            data = make_input(n)
+            timings.append((n, best_time(lambda: f(data))))
+        (_, small), (_, large) = timings
+        measured = math.log(max(large, 1e-9) / max(small, 1e-9), SIZE_RATIO)
+        self.assertLessEqual(
+                measured,
+                exponent + EXPONENT_SLACK,
+                "{} should run in O(n**{}) time, but the time grew as n**{:.2f}:\n{}"
+                .format(f.__name__, exponent, measured, timing_diagnostics(timings)))
+
+
+@performance
+class TestSortedPerformance(PerformanceTestCase):
+
+    @performance_settings
+    @hypothesis.given(size=strategies.workload_sizes)
+    def test_is_sorted_is_linear(self, size):
+        # A sorted sequence is the worst case, since every pair is compared
+        self.assertGrowthAtMost(tools.is_sorted, lambda n: list(range(n)), size, 1)
+
+
+@performance
+class TestDatabasePerformance(PerformanceTestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.loop.close()
+        self.tmp_dir.cleanup()
+
+    def _make_database(self):
+        """Database on a new SQLite file, executing commands with sqlite3 instead of ODBC."""
+        database_path = os.path.join(self.tmp_dir.name, "bogo{}.db".format(len(os.listdir(self.tmp_dir.name))))
+        database = db.Database("Database=" + database_path, SCHEMA_PATH)
+        self.loop.run_until_complete(database.init())
+        connection = sqlite3.connect(database_path)
+        self.addCleanup(connection.close)
+        commands = []
+
+        async def execute_sql(command, data, commit):
+            commands.append(command)
+            cursor = connection.execute(command, data)
+            if not commit:
+                return cursor.fetchall()
+            connection.commit()
+
+        database._execute_sql = execute_sql
+        return database, connection, commands
+
+    def _checkpoint(self, bogo, size):
+        return algorithms.Checkpoint(list(range(size, 0, -1)), 0, bogo.shuffles, size)
+
+    def _save_state(self, database, commands, bogo, random_state, now, checkpoint=None):
+        before = len(commands)
+        self.loop.run_until_complete(database.save_state(bogo, random_state, now, checkpoint))
+        return commands[before:]
+
+    @performance_settings
+    @hypothesis.given(bogo_rows=hypothesis.strategies.lists(strategies.database_bogo_rows,
+                                                            min_size=1, max_size=100),
+                      size=strategies.workload_sizes)
+    def test_save_state_query_count_is_bounded(self, bogo_rows, size):
+        database, connection, commands = self._make_database()
+        random_state = tuple(range(size))
+        saves = {"insert": [], "update": [], "checkpoint": []}
+        start = timeit.default_timer()
+        for created, row in enumerate(bogo_rows):
+            bogo = Bogo.from_database_row(row)
+            # New bogos are the newest ones
+            bogo.db_id, bogo.created = None, created
+            # Drawn shuffle counts are unbounded, but SQLite integers are 64 bit
+            bogo.shuffles = 0
+            bogo.sequence = list(range(size, 0, -1))
+            saves["insert"].append(self._save_state(database, commands, bogo, random_state, row[2]))
+            bogo.db_id = connection.execute("select max(id) from bogos").fetchone()[0]
+            bogo.shuffles += 1
+            saves["update"].append(self._save_state(database, commands, bogo, random_state, row[2]))
+            saves["checkpoint"].append(self._save_state(database, commands, bogo, random_state,
+                                                        row[2], self._checkpoint(bogo, size)))
+        elapsed = timeit.default_timer() - start
+        self.assertEqual(connection.execute("select count(*) from bogos").fetchone()[0],
+                         len(bogo_rows))
+        self.assertEqual(connection.execute("select count(*) from enumeration").fetchone()[0],
+                         len(bogo_rows))
+        for kind, issued in saves.items():
+            counts = [len(save_commands) for save_commands in issued]
+            self.assertLessEqual(
+                    max(counts),
+                    SAVE_STATE_MAX_QUERIES,
+                    "save_state ({}) should issue at most {} SQL commands, but issued {} when "
+                    "saving {} bogos with sequences of length {} in {:.6f} s, commands:\n{}"
+                    .format(kind, SAVE_STATE_MAX_QUERIES, max(counts), len(bogo_rows), size, elapsed,
+                            "\n".join("  " + command for command in issued[counts.index(max(counts))])))
+            self.assertEqual(len(set(counts)), 1,
+                             "The number of SQL commands issued by save_state ({}) should not "
+                             "depend on previously saved bogos, got counts {}."
+                             .format(kind, sorted(set(counts))))
+
+
+class FakeWebSocket:
+    """WebSocket whose recv returns on each tick, like a main.js client answering every state message."""
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.sent = 0
+
+    async def send(self, data):
+        self.sent += 1
+
+    async def recv(self):
+        await self.ticker.future
+        return "OK"
+
+
+class Ticker:
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+
+    def tick(self):
+        future, self.future = self.future, self.loop.create_future()
+        future.set_result(None)
+
+
+@performance
+class TestFeedPerformance(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    async def _wait_for_sends(self, sockets, total):
+        while sum(socket.sent for socket in sockets) < total:
+            await asyncio.sleep(0)
+
+    @performance_settings
+    @hypothesis.given(spectator_count=strategies.spectator_counts,
+                      init_args=strategies.bogo_init_arg_tuples,
+                      ticks=hypothesis.strategies.integers(min_value=1, max_value=5))
+    def test_feed_serializes_once_per_tick(self, spectator_count, init_args, ticks):
+        bogo = Bogo(*init_args)
+        ws_manager = ws.WebSocketManager(lambda: (bogo.shuffles, bogo.is_finished()))
+        ticker = Ticker(self.loop)
+        sockets = [FakeWebSocket(ticker) for _ in range(spectator_count)]
+        feeds = [asyncio.ensure_future(ws_manager.feed(None, socket)) for socket in sockets]
+        self.loop.run_until_complete(self._wait_for_sends(sockets, spectator_count))
+        try:
+            with unittest.mock.patch.object(ws.json, "dumps", wraps=json.dumps) as dumps:
+                start = timeit.default_timer()
+                for tick in range(1, ticks + 1):
+                    bogo.shuffles += 1
+                    ticker.tick()
+                    self.loop.run_until_complete(
+                            self._wait_for_sends(sockets, spectator_count * (tick + 1)))
+                elapsed = timeit.default_timer() - start
+            self.assertEqual(
+                    dumps.call_count,
+                    ticks,
+                    "Each tick should serialize the feed state once for all {} spectators, "
+                    "but {} ticks serialized it {} times in {:.6f} s ({:.3f} us per message)."
+                    .format(spectator_count, ticks, dumps.call_count, elapsed,
+                            1e6 * elapsed / (ticks * spectator_count)))
+        finally:
+            for feed in feeds:
+                feed.cancel()
+            self.loop.run_until_complete(asyncio.gather(*feeds, return_exceptions=True))
+        self.assertEqual(ws_manager.spectators.count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
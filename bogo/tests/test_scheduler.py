@@ -0,0 +1,53 @@
+import asyncio
+import unittest
+
+import hypothesis
+
+from bogoapp.scheduler import AdaptiveScheduler
+
+
+lags = hypothesis.strategies.floats(min_value=0, max_value=1)
+
+
+class TestAdaptiveScheduler(unittest.TestCase):
+
+    @hypothesis.given(lags=hypothesis.strategies.lists(lags, min_size=1))
+    def test_slice_stays_within_bounds(self, lags):
+        scheduler = AdaptiveScheduler(min_slice=0.0001, initial_slice=0.001, max_slice=0.01)
+        for lag in lags:
+            scheduler.adjust(lag)
+            self.assertGreaterEqual(scheduler.slice_seconds, scheduler.min_slice)
+            self.assertLessEqual(scheduler.slice_seconds, scheduler.max_slice)
+
+    def test_slice_shrinks_when_latency_is_over_target(self):
+        scheduler = AdaptiveScheduler(target_latency=0.005, initial_slice=0.004)
+        scheduler.adjust(0.002)
+        self.assertEqual(scheduler.slice_seconds, 0.002)
+
+    def test_slice_grows_when_latency_is_under_target(self):
+        scheduler = AdaptiveScheduler(target_latency=0.005, initial_slice=0.001)
+        scheduler.adjust(0.0)
+        self.assertGreater(scheduler.slice_seconds, 0.001)
+
+    def test_invalid_bounds(self):
+        with self.assertRaises(ValueError):
+            AdaptiveScheduler(min_slice=0.01, initial_slice=0.001)
+
+    def test_yield_records_loop_lag(self):
+        scheduler = AdaptiveScheduler()
+        loop = asyncio.new_event_loop()
+        try:
+            for _ in range(10):
+                loop.run_until_complete(scheduler.yield_to_loop())
+                scheduler.deadline()
+        finally:
+            loop.close()
+        self.assertEqual(scheduler.loop_lag.count, 10)
+        self.assertEqual(scheduler.slices.count, 10)
+        exported = scheduler.as_dict()
+        self.assertEqual(exported["slice_seconds"], scheduler.slice_seconds)
+        self.assertEqual(sum(count for _, count in exported["loop_lag"]["buckets"]), 10)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+import hypothesis
+
+from . import strategies
+
+from bogoapp import shared
+
+
+def _try_acquire(path, result_queue):
+    result_queue.put(shared.SorterLock(path).acquire())
+
+
+def _add_spectators(path, delta, n):
+    state = shared.SharedState(path)
+    for _ in range(n):
+        state.spectators.add(delta)
+    state.close()
+
+
+class TestSorterLock(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "sorter.lock")
+        self.context = multiprocessing.get_context("spawn")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _acquire_in_other_process(self):
+        result_queue = self.context.Queue()
+        process = self.context.Process(target=_try_acquire, args=(self.path, result_queue))
+        process.start()
+        process.join()
+        return result_queue.get()
+
+    def test_only_one_process_is_elected(self):
+        lock = shared.SorterLock(self.path)
+        self.assertTrue(lock.acquire())
+        self.assertTrue(lock.acquire(), "Acquiring a held lock again should succeed.")
+        self.assertFalse(self._acquire_in_other_process(),
+                         "Another process should not be elected while the lock is held.")
+        lock.release()
+        self.assertFalse(lock.acquired)
+        self.assertTrue(self._acquire_in_other_process(),
+                        "Another process should be elected after the lock is released.")
+
+
+class TestSharedState(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "state")
+        shared.SharedState.reset(self.path)
+        self.writer = shared.SharedState(self.path)
+        self.reader = shared.SharedState(self.path)
+
+    def tearDown(self):
+        self.writer.close()
+        self.reader.close()
+        self.tmp_dir.cleanup()
+
+    @hypothesis.given(shuffles=strategies.natural_numbers.filter(lambda n: n < 2**63),
+                      finished=hypothesis.strategies.booleans())
+    def test_published_state_is_visible_to_readers(self, shuffles, finished):
+        self.writer.publish(shuffles, finished)
+        self.assertTupleEqual(self.reader.get_current_state(), (shuffles, finished))
+
+    def test_ready_flag(self):
+        self.assertFalse(self.reader.is_ready())
+        self.writer.set_ready()
+        self.assertTrue(self.reader.is_ready())
+
+    def test_failed_flag(self):
+        self.assertFalse(self.reader.has_failed())
+        self.writer.set_failed()
+        self.assertTrue(self.reader.has_failed())
+        self.assertFalse(self.reader.is_ready())
+
+    def test_reset_clears_flags_of_previous_run(self):
+        self.writer.publish(10, True)
+        self.writer.set_ready()
+        self.writer.set_failed()
+        self.writer.spectators.add(3)
+        self.writer.close()
+        self.reader.close()
+        shared.SharedState.reset(self.path)
+        self.writer = shared.SharedState(self.path)
+        self.reader = shared.SharedState(self.path)
+        self.assertFalse(self.reader.is_ready())
+        self.assertFalse(self.reader.has_failed())
+        self.assertTupleEqual(self.reader.get_current_state(), (0, False))
+        self.assertEqual(self.reader.spectators.count(), 0)
+
+    def test_spectator_counter_is_shared_between_processes(self):
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=_add_spectators, args=(self.path, 1, 100))
+                     for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.reader.spectators.count(), 400)
+        self.assertEqual(self.reader.spectators.add(-1000), 0,
+                         "The spectator count should never be negative.")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)